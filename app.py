@@ -2,27 +2,104 @@
 app.py - Flask Web Application for CBIR System
 """
 
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from flask import (Flask, Response, render_template, request, jsonify, send_from_directory,
+                   stream_with_context, copy_current_request_context)
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import json
 import os
+import shutil
 from pathlib import Path
+from werkzeug.exceptions import RequestEntityTooLarge
 from werkzeug.utils import secure_filename
 import sys
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from src.shape_features import extract_shape_features, process_all_shape_images
-from src.texture_features import extract_texture_features, process_all_texture_images
-from src.shape_retrieval import retrieve_similar_shapes
-from src.texture_retrieval import retrieve_similar_textures
+from src.shape_features import process_all_shape_images
+from src.texture_features import process_all_texture_images
+from src.shape_retrieval import SHAPE_BLOCKS, shape_block_weights
+from src.texture_retrieval import TEXTURE_BLOCKS, texture_block_weights
+from src.catalog import (COLLECTIONS, SHAPE_EXTENSIONS, TEXTURE_EXTENSIONS, TEXTURE_PROFILE,
+                         SHAPE_PROFILE, DUPLICATE_POLICY)
+from src.hybrid_retrieval import (FUSION_METHODS, process_all_hybrid_images,
+                                  build_hybrid_index, retrieve_similar_hybrid)
 from src.utils import save_features_to_json
+from src.watcher import IngestWatcher, default_collections, load_hash_indexes
+from src.feature_index import FeatureIndex, load_snapshot, search_snapshot
+from src.bulk_ingest import is_archive, iter_archive_members, ingest_files
+from src.dedup import check_duplicate
+from src.result_cache import RankedResultCache, make_cursor
+from src.sketch import snapshot_sketch, search_sketch
+from src.admission import WorkQueue, Overloaded, DeadlineExceeded
 
 app = Flask(__name__)
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
+app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max request
+app.config['BULK_MAX_CONTENT_LENGTH'] = 512 * 1024 * 1024  # 512MB max bulk upload request
+app.config['MAX_FILE_SIZE'] = 16 * 1024 * 1024  # 16MB max file size
 app.config['UPLOAD_FOLDER'] = 'uploads'
+app.config['DUPLICATE_POLICY'] = DUPLICATE_POLICY
 app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
+app.config['SEARCH_PAGE_SIZE'] = 50
+app.config['SEARCH_MAX_TOP_K'] = 10000
+app.config['INGEST_WORKERS'] = max(1, (os.cpu_count() or 1) // 2)
+app.config['INGEST_QUEUE'] = 16
+app.config['INGEST_TIMEOUT'] = 300.0  # seconds
+app.config['SEARCH_WORKERS'] = os.cpu_count() or 1
+app.config['SEARCH_QUEUE'] = 64
+app.config['SEARCH_TIMEOUT'] = 10.0  # seconds
+app.config['HYBRID_IMAGES_FOLDER'] = 'data/Hybrid'
+app.config['HYBRID_SHAPE_FEATURES'] = 'features/Hybrid/Formes'
+app.config['HYBRID_TEXTURE_FEATURES'] = 'features/Hybrid/Textures'
 app.template_folder = 'template'
 
+# Live shape/texture indexes. Searches read .snapshot without locking;
+# uploads, extraction and the watcher publish new snapshots. Only features of
+# the configured profiles are loaded; others are reported and left out.
+shape_index = FeatureIndex(SHAPE_BLOCKS, load_snapshot(
+    'features/Formes', 'data/Formes', SHAPE_EXTENSIONS, SHAPE_BLOCKS, SHAPE_PROFILE))
+texture_index = FeatureIndex(TEXTURE_BLOCKS, load_snapshot(
+    'features/Textures', 'data/Textures', TEXTURE_EXTENSIONS, TEXTURE_BLOCKS, TEXTURE_PROFILE))
+
+# Content/perceptual hashes per collection, for duplicate detection at ingest
+hash_indexes = load_hash_indexes(default_collections())
+
+# Rankings behind paginated and streamed searches
+result_cache = RankedResultCache()
+
+# Sketches of the live shape/texture snapshots, rebuilt on first use after
+# each publish, for searches with "prefilter": "sketch"
+sketch_caches = {'shapes': {}, 'textures': {}}
+
+# Bounded worker pools for CPU-heavy handlers: uploads/extraction and searches
+# queue separately, so a burst of one cannot starve the other
+work_queues = {
+    'ingest': WorkQueue('ingest', app.config['INGEST_WORKERS'], app.config['INGEST_QUEUE'],
+                        app.config['INGEST_TIMEOUT']),
+    'search': WorkQueue('search', app.config['SEARCH_WORKERS'], app.config['SEARCH_QUEUE'],
+                        app.config['SEARCH_TIMEOUT']),
+}
+
+# Extraction threads shared by uploads, bulk uploads, full re-extraction and
+# the watcher, so together they never run more than INGEST_WORKERS at once
+# (ingest queue workers only wait on it)
+extraction_executor = ThreadPoolExecutor(app.config['INGEST_WORKERS'],
+                                         thread_name_prefix='extract')
+
+
+# Run a CPU-heavy extraction call on extraction_executor and wait for it
+def run_extraction(fn, *args, **kwargs):
+    return extraction_executor.submit(fn, *args, **kwargs).result()
+
+# Hybrid index, built on first hybrid search and reset after extraction
+# (which also bumps the generation, invalidating cached hybrid rankings)
+hybrid_index = None
+hybrid_generation = 0
+
+# Directory watcher, started with CBIR_WATCH=1
+ingest_watcher = None
+
 # Create upload folder
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
@@ -33,6 +110,43 @@ def allowed_file(filename):
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
 
+# Run a view on one of the work queues. Full queues answer 503 with
+# Retry-After; work past its deadline (the queue's timeout, or a shorter
+# X-Request-Timeout header in seconds) answers 504.
+def admitted(queue_name):
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            timeout = request.headers.get('X-Request-Timeout', type=float)
+            try:
+                return work_queues[queue_name].run(copy_current_request_context(view),
+                                                   *args, timeout=timeout, **kwargs)
+            except Overloaded as e:
+                return (jsonify({'success': False, 'error': str(e)}), 503,
+                        {'Retry-After': str(e.retry_after)})
+            except DeadlineExceeded as e:
+                return jsonify({'success': False, 'error': str(e)}), 504
+        return wrapper
+    return decorator
+
+
+# Rebuild a collection's index from its features folder, picking up
+# features written by other processes (cli.py extract, the feature scripts)
+def reload_index(collection_name):
+    collection = COLLECTIONS[collection_name]
+    index = shape_index if collection_name == 'shapes' else texture_index
+    index.replace(load_snapshot(collection['features_folder'], collection['images_folder'],
+                                collection['extensions'], collection['blocks'],
+                                collection['profile']))
+    return index.snapshot
+
+
+# Publish features extracted by the directory watcher
+def publish_ingested(collection_name, items):
+    index = shape_index if collection_name == 'shapes' else texture_index
+    index.publish([(os.path.basename(path), path, features) for path, features in items])
+
+
 # Home page
 @app.route('/')
 def index():
@@ -59,9 +173,11 @@ def get_texture_images():
 
 # Extract features for all shape images.
 @app.route('/api/extract/shapes', methods=['POST'])
+@admitted('ingest')
 def extract_shapes():
     try:
-        process_all_shape_images('data/Formes', 'features/Formes')
+        run_extraction(process_all_shape_images, 'data/Formes', 'features/Formes')
+        reload_index('shapes')
         return jsonify({'success': True, 'message': 'Shape features extracted successfully'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -69,48 +185,148 @@ def extract_shapes():
 
 # Extract features for all texture images.
 @app.route('/api/extract/textures', methods=['POST'])
+@admitted('ingest')
 def extract_textures():
     try:
-        process_all_texture_images('data/Textures', 'features/Textures')
+        run_extraction(process_all_texture_images, 'data/Textures', 'features/Textures',
+                       profile=TEXTURE_PROFILE)
+        reload_index('textures')
         return jsonify({'success': True, 'message': 'Texture features extracted successfully'})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Reload one collection ({"collection": "shapes"}) or both from features/,
+# after features were extracted outside this process.
+@app.route('/api/index/reload', methods=['POST'])
+@admitted('ingest')
+def reload_indexes():
+    try:
+        data = request.get_json(silent=True) or {}
+        names = [data['collection']] if data.get('collection') else ['shapes', 'textures']
+        unknown = [name for name in names if name not in ('shapes', 'textures')]
+        if unknown:
+            return jsonify({'success': False,
+                            'error': f"Unknown collection: {unknown[0]}"}), 400
+        
+        reloaded = {}
+        for name in names:
+            snapshot = reload_index(name)
+            reloaded[name] = {'images': len(snapshot), 'version': snapshot.version}
+        return jsonify({'success': True, 'reloaded': reloaded})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Extract shape and texture features for all hybrid catalogue images.
+@app.route('/api/extract/hybrid', methods=['POST'])
+@admitted('ingest')
+def extract_hybrid():
+    global hybrid_index, hybrid_generation
+    try:
+        run_extraction(process_all_hybrid_images, app.config['HYBRID_IMAGES_FOLDER'],
+                       app.config['HYBRID_SHAPE_FEATURES'],
+                       app.config['HYBRID_TEXTURE_FEATURES'],
+                       texture_profile=TEXTURE_PROFILE)
+        hybrid_index = None
+        hybrid_generation += 1
+        return jsonify({'success': True, 'message': 'Hybrid features extracted successfully'})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Answer a search from a cached ranking: all results (default), one page
+# ('page_size', then 'cursor' for the following pages) or an NDJSON stream
+# ('stream': true). rank(query_image, top_k) computes the ranked list.
+def ranked_search_response(data, key, rank, format_result, extra=None):
+    cursor = data.get('cursor')
+    page_size = data.get('page_size')
+    
+    if cursor:
+        resolved = result_cache.resolve(cursor)
+        if resolved is None:
+            return jsonify({'success': False,
+                            'error': 'Cursor expired or invalid, repeat the search'}), 410
+        result_id, entry, offset = resolved
+        # Cursors only page through results of the endpoint that issued them
+        if entry['key'][0] != key[0]:
+            return jsonify({'success': False,
+                            'error': f"Cursor belongs to a {entry['key'][0]} search"}), 400
+        page_size = page_size or app.config['SEARCH_PAGE_SIZE']
+    else:
+        query_image = data.get('image')
+        if not query_image:
+            return jsonify({'success': False, 'error': 'No image specified'}), 400
+        top_k = min(int(data.get('top_k', 6)), app.config['SEARCH_MAX_TOP_K'])
+        result_id, entry = result_cache.get_or_rank(
+            key + (query_image, top_k), {'query': query_image, **(extra or {})},
+            lambda: rank(query_image, top_k))
+        offset = 0
+    
+    results = entry['results']
+    
+    if data.get('stream'):
+        def generate():
+            for rank_position in range(offset, len(results)):
+                line = format_result(*results[rank_position])
+                line['rank'] = rank_position + 1
+                yield json.dumps(line) + '\n'
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    if page_size is None:
+        return jsonify({
+            'success': True,
+            **entry['info'],
+            'results': [format_result(*result) for result in results]
+        })
+    
+    page_size = max(1, int(page_size))
+    end = min(offset + page_size, len(results))
+    return jsonify({
+        'success': True,
+        **entry['info'],
+        'results': [format_result(*result) for result in results[offset:end]],
+        'offset': offset,
+        'total': len(results),
+        'next_cursor': make_cursor(result_id, end) if end < len(results) else None
+    })
+
+
+# Ranking for a shape/texture search: an exact scan of the snapshot, or a
+# Hamming sketch prefilter with exact re-rank of 'candidates' rows
+def snapshot_ranker(collection_name, snapshot, weights, data):
+    if data.get('prefilter') != 'sketch' or len(snapshot) < 2:
+        return lambda query_image, top_k: search_snapshot(snapshot, query_image, weights, top_k)
+    candidates = data.get('candidates')
+    
+    def rank(query_image, top_k):
+        sketch = snapshot_sketch(snapshot, weights, sketch_caches[collection_name])
+        return search_sketch(snapshot, sketch, query_image, weights, top_k,
+                             int(candidates) if candidates else None)
+    return rank
+
+
 # Search for similar shapes.
 @app.route('/api/search/shapes', methods=['POST'])
+@admitted('search')
 def search_shapes():
     try:
         data = request.json
-        query_image = data.get('image')
-        top_k = data.get('top_k', 6)
-        
-        if not query_image:
-            return jsonify({'success': False, 'error': 'No image specified'}), 400
-        
-        results = retrieve_similar_shapes(
-            query_image,
-            'features/Formes',
-            'data/Formes',
-            top_k
-        )
-        
-        # Format results
-        formatted_results = [
-            {
+        if data.get('prefilter') not in (None, 'sketch'):
+            return jsonify({'success': False,
+                            'error': f"Unknown prefilter: {data.get('prefilter')}"}), 400
+        snapshot = shape_index.snapshot
+        return ranked_search_response(
+            data,
+            ('shapes', snapshot.version, data.get('prefilter'), data.get('candidates')),
+            snapshot_ranker('shapes', snapshot, shape_block_weights(), data),
+            lambda name, dist, path: {
                 'name': name,
                 'distance': float(dist),
                 'similarity': max(0, 100 - dist * 10),
                 'path': f'/images/Formes/{name}'
             }
-            for name, dist, path in results
-        ]
-        
-        return jsonify({
-            'success': True,
-            'query': query_image,
-            'results': formatted_results
-        })
+        )
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -118,38 +334,80 @@ def search_shapes():
 
 # Search for similar textures.
 @app.route('/api/search/textures', methods=['POST'])
+@admitted('search')
 def search_textures():
     try:
         data = request.json
-        query_image = data.get('image')
-        top_k = data.get('top_k', 6)
-        
-        if not query_image:
-            return jsonify({'success': False, 'error': 'No image specified'}), 400
-        
-        results = retrieve_similar_textures(
-            query_image,
-            'features/Textures',
-            'data/Textures',
-            top_k
-        )
-        
-        # Format results
-        formatted_results = [
-            {
+        if data.get('prefilter') not in (None, 'sketch'):
+            return jsonify({'success': False,
+                            'error': f"Unknown prefilter: {data.get('prefilter')}"}), 400
+        snapshot = texture_index.snapshot
+        return ranked_search_response(
+            data,
+            ('textures', snapshot.version, data.get('prefilter'), data.get('candidates')),
+            snapshot_ranker('textures', snapshot, texture_block_weights(), data),
+            lambda name, dist, path: {
                 'name': name,
                 'distance': float(dist),
                 'similarity': max(0, 100 - dist * 20),
                 'path': f'/images/Textures/{name}'
             }
-            for name, dist, path in results
-        ]
+        )
         
-        return jsonify({
-            'success': True,
-            'query': query_image,
-            'results': formatted_results
-        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Search for images similar in both shape and texture.
+@app.route('/api/search/hybrid', methods=['POST'])
+@admitted('search')
+def search_hybrid():
+    global hybrid_index
+    try:
+        data = request.json
+        fusion = data.get('fusion', 'weighted')
+        if fusion not in FUSION_METHODS:
+            return jsonify({'success': False,
+                            'error': f"Unknown fusion method: {fusion} "
+                                     f"(expected one of {', '.join(FUSION_METHODS)})"}), 400
+        try:
+            shape_weight = float(data.get('shape_weight', 0.5))
+            texture_weight = float(data.get('texture_weight', 0.5))
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Invalid shape_weight or texture_weight'}), 400
+        
+        if hybrid_index is None and not data.get('cursor'):
+            # The hybrid catalogue is separate from data/Formes and
+            # data/Textures; it is empty until images are added and extracted
+            try:
+                hybrid_index = build_hybrid_index(app.config['HYBRID_SHAPE_FEATURES'],
+                                                  app.config['HYBRID_TEXTURE_FEATURES'],
+                                                  app.config['HYBRID_IMAGES_FOLDER'])
+            except ValueError as e:
+                return jsonify({'success': False,
+                                'error': f"{e}. Add images to "
+                                         f"{app.config['HYBRID_IMAGES_FOLDER']} and run "
+                                         f"POST /api/extract/hybrid first"}), 404
+        index = hybrid_index
+        
+        return ranked_search_response(
+            data,
+            ('hybrid', hybrid_generation, fusion, shape_weight, texture_weight),
+            lambda query_image, top_k: retrieve_similar_hybrid(
+                query_image,
+                index,
+                top_k,
+                fusion=fusion,
+                shape_weight=shape_weight,
+                texture_weight=texture_weight
+            ),
+            lambda name, score, path: {
+                'name': name,
+                'score': score,
+                'path': f'/images/Hybrid/{name}'
+            },
+            extra={'fusion': fusion}
+        )
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -157,8 +415,12 @@ def search_textures():
 
 # Upload a new image for search.
 @app.route('/api/upload', methods=['POST'])
+@admitted('ingest')
 def upload_file():
     try:
+        if request.content_length and request.content_length > app.config['MAX_FILE_SIZE']:
+            return jsonify({'success': False, 'error': 'File too large'}), 413
+        
         if 'file' not in request.files:
             return jsonify({'success': False, 'error': 'No file provided'}), 400
         
@@ -173,34 +435,134 @@ def upload_file():
             filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
             file.save(filepath)
             
-            # Extract features
             if search_type == 'shape':
-                features = extract_shape_features(filepath)
-                json_path = os.path.join('features/Formes', Path(filename).stem + '.json')
-                save_features_to_json(features, json_path)
-                # Copy to data folder
-                import shutil
-                shutil.copy(filepath, os.path.join('data/Formes', filename))
+                collection, index = COLLECTIONS['shapes'], shape_index
+            else:
+                collection, index = COLLECTIONS['textures'], texture_index
+            hash_index = hash_indexes[collection['name']]
+            
+            if index.snapshot.profile not in (None, collection['profile']):
+                return jsonify({'success': False,
+                                'error': f"Index uses profile {index.snapshot.profile}, "
+                                         f"uploads use {collection['profile']}; "
+                                         f"re-extract {collection['name']} first"}), 409
+            
+            duplicate = check_duplicate(hash_index, collection['features_folder'], filepath,
+                                        filename, app.config['DUPLICATE_POLICY'],
+                                        collection['profile'])
+            if duplicate['action'] == 'skip':
+                return jsonify({
+                    'success': True,
+                    'filename': filename,
+                    'skipped': True,
+                    'duplicate': duplicate['duplicate'],
+                    'duplicate_of': duplicate['duplicate_of'],
+                    'message': f"Near duplicate of {duplicate['duplicate_of']}, not ingested"
+                })
+            
+            # Extract features (unless reused from an exact duplicate), copy
+            # to data folder, then save features (after the copy, so the
+            # watcher sees them as up to date)
+            if duplicate['action'] == 'reuse':
+                features = duplicate['features']
             else:
-                features = extract_texture_features(filepath)
-                json_path = os.path.join('features/Textures', Path(filename).stem + '.json')
-                save_features_to_json(features, json_path)
-                # Copy to data folder
-                import shutil
-                shutil.copy(filepath, os.path.join('data/Textures', filename))
+                features = run_extraction(collection['extract'], filepath)
+            index.validate(filename, features)
+            image_path = os.path.join(collection['images_folder'], filename)
+            shutil.copy(filepath, image_path)
+            json_path = os.path.join(collection['features_folder'], Path(filename).stem + '.json')
+            save_features_to_json(features, json_path)
+            index.publish([(filename, image_path, features)])
+            hash_index.add(filename, *duplicate['hashes'])
+            hash_index.save()
             
             return jsonify({
                 'success': True,
                 'filename': filename,
-                'message': 'File uploaded and features extracted'
+                'duplicate': duplicate['duplicate'],
+                'duplicate_of': duplicate['duplicate_of'],
+                'message': ('File uploaded, features reused from an exact duplicate'
+                            if duplicate['action'] == 'reuse'
+                            else 'File uploaded and features extracted')
             })
         
         return jsonify({'success': False, 'error': 'Invalid file type'}), 400
         
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'File too large'}), 413
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Uploaded images, with archive members read one at a time. An archive that
+# cannot be read is yielded with the error, after any members read before it.
+def iter_uploaded_images(files):
+    for file in files:
+        if is_archive(file.filename):
+            try:
+                yield from iter_archive_members(file.stream, file.filename,
+                                                app.config['MAX_FILE_SIZE'])
+            except Exception as e:
+                yield file.filename, e
+        else:
+            yield file.filename, file.read(app.config['MAX_FILE_SIZE'] + 1)
+
+
+# Upload many images (or zip/tar archives of images) at once.
+@app.route('/api/upload/bulk', methods=['POST'])
+@admitted('ingest')
+def upload_bulk():
+    try:
+        # Only this endpoint accepts requests above MAX_CONTENT_LENGTH
+        request.max_content_length = app.config['BULK_MAX_CONTENT_LENGTH']
+        files = [f for f in request.files.getlist('files') if f.filename]
+        search_type = request.form.get('type', 'shape')
+        
+        if not files:
+            return jsonify({'success': False, 'error': 'No files provided'}), 400
+        
+        if search_type == 'shape':
+            collection, index = COLLECTIONS['shapes'], shape_index
+        else:
+            collection, index = COLLECTIONS['textures'], texture_index
+        
+        report = ingest_files(iter_uploaded_images(files), collection, index.publish,
+                              app.config['UPLOAD_FOLDER'],
+                              max_workers=app.config['INGEST_WORKERS'],
+                              max_file_size=app.config['MAX_FILE_SIZE'],
+                              hash_index=hash_indexes[collection['name']],
+                              duplicate_policy=app.config['DUPLICATE_POLICY'],
+                              validate=index.validate,
+                              executor=extraction_executor)
+        
+        if 'publish_error' in report:
+            return jsonify({'success': False, 'error': report['publish_error'], **report}), 500
+        return jsonify({'success': True, **report})
+        
+    except RequestEntityTooLarge:
+        return jsonify({'success': False, 'error': 'Request too large'}), 413
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# Ingest watcher statistics.
+@app.route('/api/ingest/stats')
+def ingest_stats():
+    duplicates = {name: hash_index.stats() for name, hash_index in hash_indexes.items()}
+    if ingest_watcher is None:
+        return jsonify({'success': True, 'watching': False, 'duplicates': duplicates})
+    return jsonify({'success': True, 'watching': True, 'stats': ingest_watcher.stats(),
+                    'duplicates': duplicates})
+
+
+# Work queue depth, wait times and rejections, plus result cache counters.
+@app.route('/api/metrics')
+def metrics():
+    return jsonify({'success': True,
+                    'queues': {name: queue.stats() for name, queue in work_queues.items()},
+                    'result_cache': result_cache.stats()})
+
+
 # Serve images from data folder
 @app.route('/images/<folder>/<filename>')
 def serve_image(folder, filename):
@@ -214,4 +576,11 @@ def serve_upload(filename):
 
 
 if __name__ == '__main__':
+    # With the debug reloader, only the serving child process watches
+    if os.environ.get('CBIR_WATCH') == '1' and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        ingest_watcher = IngestWatcher(default_collections(),
+                                       on_publish=publish_ingested,
+                                       hash_indexes=hash_indexes,
+                                       duplicate_policy=DUPLICATE_POLICY,
+                                       executor=extraction_executor).start()
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+bench_chunked.py - Streaming chunked scan vs. the full-list scan
+
+Writes a synthetic shape catalogue, then compares retrieve_similar_shapes
+(one distance tuple per image, sorted) with retrieve_chunked for several
+chunk sizes, with and without read-ahead: query time and peak Python heap
+allocation (tracemalloc).
+
+Usage: python benchmarks/bench_chunked.py [num_images]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from bench_hybrid import write_synthetic_catalogue
+from src.shape_retrieval import SHAPE_BLOCKS, shape_block_weights, retrieve_similar_shapes
+from src.chunked_retrieval import retrieve_chunked
+
+
+# Elapsed seconds and peak traced bytes of one call
+def measure(fn):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rng = np.random.default_rng(0)
+    weights = shape_block_weights()
+    extensions = ['.png']
+
+    with tempfile.TemporaryDirectory() as root:
+        shape_folder, _, images_folder = write_synthetic_catalogue(root, num_images, rng)
+        query = 'img000000.png'
+
+        expected, elapsed, peak = measure(
+            lambda: retrieve_similar_shapes(query, shape_folder, images_folder, 6))
+        print(f"Images:                         {num_images}")
+        print(f"Full-list scan:                 {elapsed * 1000:9.1f} ms  "
+              f"peak {peak / 2**20:7.2f} MiB")
+
+        for chunk_size in (256, 1024, 4096):
+            for prefetch in (False, True):
+                results, elapsed, peak = measure(lambda: retrieve_chunked(
+                    query, shape_folder, images_folder, extensions, SHAPE_BLOCKS,
+                    weights, 6, chunk_size, prefetch))
+                same = [name for name, _, _ in results] == [name for name, _, _ in expected]
+                print(f"Chunked {chunk_size:5d} {'read-ahead' if prefetch else '          '}:"
+                      f"  {elapsed * 1000:9.1f} ms  peak {peak / 2**20:7.2f} MiB"
+                      f"  {'same results' if same else 'DIFFERENT results'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+bench_contour.py - Shape extraction with and without contour resampling
+
+Upscales the shape dataset to high-resolution silhouettes and times
+extract_shape_features on the full pixel contour (num_contour_points=None)
+against the default arc-length resampled contour.
+
+Usage: python benchmarks/bench_contour.py [scale] [images_folder]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import cv2
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils import load_image
+from src.shape_features import (extract_contour, resample_contour, fourier_descriptors,
+                                edge_direction_histogram, extract_shape_features)
+
+
+def write_upscaled(images_folder, output_folder, scale):
+    paths = []
+    for image_path in sorted(Path(images_folder).glob('*.gif')):
+        gray, _ = load_image(str(image_path))
+        big = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_NEAREST)
+        out = os.path.join(output_folder, image_path.stem + '.png')
+        cv2.imwrite(out, big)
+        paths.append(out)
+    return paths
+
+
+def time_descriptors(contour, prepare):
+    start = time.perf_counter()
+    for _ in range(10):
+        points = prepare(contour)
+        fourier_descriptors(points)
+        edge_direction_histogram(points)
+    return (time.perf_counter() - start) / 10
+
+
+def main():
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 8
+    images_folder = sys.argv[2] if len(sys.argv) > 2 else 'data/Formes'
+
+    with tempfile.TemporaryDirectory() as root:
+        paths = write_upscaled(images_folder, root, scale)
+
+        raw_points, raw_desc, resampled_desc = 0, 0.0, 0.0
+        for path in paths:
+            gray, _ = load_image(path)
+            contour = extract_contour(gray)
+            simple = extract_contour(gray, cv2.CHAIN_APPROX_SIMPLE)
+            raw_points += len(contour)
+            raw_desc += time_descriptors(contour, lambda c: c)
+            resampled_desc += time_descriptors(simple, resample_contour)
+
+        timings = {}
+        for label, num_points in (('full contour', None), ('resampled 256', 256)):
+            start = time.perf_counter()
+            for path in paths:
+                extract_shape_features(path, num_contour_points=num_points)
+            timings[label] = (time.perf_counter() - start) / len(paths)
+
+    print(f"Images: {len(paths)} at {scale}x, mean contour length "
+          f"{raw_points / len(paths):.0f} points")
+    print(f"Descriptors, full contour:    {raw_desc / len(paths) * 1000:8.2f} ms/image")
+    print(f"Resample + descriptors, 256:  {resampled_desc / len(paths) * 1000:8.2f} ms/image"
+          f"  ({raw_desc / resampled_desc:.1f}x)")
+    for label, elapsed in timings.items():
+        print(f"extract_shape_features, {label:14s} {elapsed * 1000:8.2f} ms/image")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+bench_hybrid.py - Hybrid query vs. two separate shape/texture searches
+
+Writes a synthetic catalogue of feature files with the real feature layout,
+loads it into in-memory shape and texture snapshots and a hybrid index, then
+times a shape search_snapshot + a texture search_snapshot against a single
+retrieve_similar_hybrid query. Both sides search memory only, so the
+comparison excludes JSON loading.
+
+Usage: python benchmarks/bench_hybrid.py [num_images]
+"""
+
+import os
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils import save_features_to_json
+from src.feature_index import load_snapshot, search_snapshot
+from src.shape_retrieval import SHAPE_BLOCKS, shape_block_weights
+from src.texture_retrieval import TEXTURE_BLOCKS, texture_block_weights
+from src.hybrid_retrieval import build_hybrid_index, retrieve_similar_hybrid
+
+
+def write_synthetic_catalogue(root, num_images, rng):
+    shape_folder = os.path.join(root, 'features', 'Formes')
+    texture_folder = os.path.join(root, 'features', 'Textures')
+    images_folder = os.path.join(root, 'images')
+    os.makedirs(images_folder, exist_ok=True)
+
+    for i in range(num_images):
+        name = f'img{i:06d}'
+        save_features_to_json({
+            'image_name': name + '.png',
+            'fourier_descriptors': rng.random(20),
+            'direction_histogram': rng.dirichlet(np.ones(36)),
+            'hu_moments': rng.normal(-10, 3, 7),
+        }, os.path.join(shape_folder, name + '.json'))
+        save_features_to_json({
+            'image_name': name + '.png',
+            'gabor_features': rng.random(64) * 50,
+            'tamura_coarseness': float(rng.random() * 16),
+            'tamura_contrast': float(rng.random() * 60),
+            'tamura_directionality': float(rng.random()),
+            'direction_histogram': rng.dirichlet(np.ones(16)),
+            'glcm_features': rng.random(10),
+        }, os.path.join(texture_folder, name + '.json'))
+        open(os.path.join(images_folder, name + '.png'), 'wb').close()
+
+    return shape_folder, texture_folder, images_folder
+
+
+def best_of(fn, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    rng = np.random.default_rng(0)
+
+    with tempfile.TemporaryDirectory() as root:
+        shape_folder, texture_folder, images_folder = write_synthetic_catalogue(
+            root, num_images, rng)
+        query = 'img000000.png'
+
+        shapes = load_snapshot(shape_folder, images_folder, ['.png'], SHAPE_BLOCKS)
+        textures = load_snapshot(texture_folder, images_folder, ['.png'], TEXTURE_BLOCKS)
+        start = time.perf_counter()
+        index = build_hybrid_index(shape_folder, texture_folder, images_folder)
+        build = time.perf_counter() - start
+
+    shape_weights, texture_weights = shape_block_weights(), texture_block_weights()
+    separate = best_of(lambda: (
+        search_snapshot(shapes, query, shape_weights, 6),
+        search_snapshot(textures, query, texture_weights, 6),
+    ), 20)
+    hybrid = {
+        fusion: best_of(lambda: retrieve_similar_hybrid(query, index, 6, fusion=fusion), 20)
+        for fusion in ('weighted', 'rrf')
+    }
+
+    print(f"Images:                       {num_images}")
+    print(f"Shape + texture snapshots:    {separate * 1000:10.2f} ms")
+    print(f"Hybrid index build (once):    {build * 1000:10.2f} ms")
+    for fusion, elapsed in hybrid.items():
+        print(f"Hybrid query ({fusion:8s}):     {elapsed * 1000:10.2f} ms"
+              f"  ({elapsed / separate:.2f}x the two searches)")
+
+
+if __name__ == "__main__":
+    main()
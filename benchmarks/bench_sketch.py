@@ -0,0 +1,79 @@
+"""
+bench_sketch.py - Hamming-prefiltered search vs. the full float scan
+
+Builds an in-memory snapshot of clustered synthetic shape features (real
+feature layout), then compares search_snapshot against search_sketch for
+several sketch sizes: per-query latency and recall of the exact top-k.
+
+Usage: python benchmarks/bench_sketch.py [num_images]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.utils import block_offsets
+from src.shape_retrieval import SHAPE_BLOCKS, shape_block_weights
+from src.feature_index import IndexSnapshot, search_snapshot
+from src.sketch import build_sketch_index, search_sketch
+
+
+# Clustered rows so that nearest neighbours are meaningful
+def synthetic_snapshot(num_images, rng, num_clusters=500):
+    def sample(n):
+        return np.hstack([
+            rng.random((n, 20)),
+            rng.dirichlet(np.ones(36), n),
+            rng.normal(-10, 3, (n, 7)),
+        ])
+
+    centers = sample(num_clusters)
+    labels = rng.integers(num_clusters, size=num_images)
+    matrix = centers[labels] + 0.05 * rng.standard_normal((num_images, centers.shape[1])) * centers.std(axis=0)
+    offsets = block_offsets({
+        'fourier_descriptors': [0.0] * 20,
+        'direction_histogram': [0.0] * 36,
+        'hu_moments': [0.0] * 7,
+    }, SHAPE_BLOCKS)
+    names = [f'img{i:07d}.png' for i in range(num_images)]
+    return IndexSnapshot(names, names, matrix, offsets)
+
+
+def mean_time(fn, queries):
+    start = time.perf_counter()
+    results = [fn(query) for query in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    num_images = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    top_k = 6
+    rng = np.random.default_rng(0)
+    snapshot = synthetic_snapshot(num_images, rng)
+    weights = shape_block_weights()
+    queries = [snapshot.names[i] for i in rng.choice(num_images, 50, replace=False)]
+
+    scan, exact = mean_time(lambda q: search_snapshot(snapshot, q, weights, top_k), queries)
+    exact_names = [{name for name, _, _ in results} for results in exact]
+
+    print(f"Images:                    {num_images}")
+    print(f"Float scan:                {scan * 1000:10.2f} ms/query"
+          f"  ({snapshot.matrix.nbytes / 2**20:.0f} MiB scanned)")
+    for method, num_bits in (('srp', 64), ('srp', 128), ('srp', 256), ('itq', 32), ('itq', 63)):
+        start = time.perf_counter()
+        sketch = build_sketch_index(snapshot, weights, num_bits, method)
+        build = time.perf_counter() - start
+        elapsed, results = mean_time(
+            lambda q: search_sketch(snapshot, sketch, q, weights, top_k), queries)
+        recall = np.mean([len(expected & {name for name, _, _ in found}) / top_k
+                          for expected, found in zip(exact_names, results)])
+        print(f"Sketch {method} {num_bits:3d} bits:     {elapsed * 1000:10.2f} ms/query"
+              f"  ({scan / elapsed:4.1f}x, recall@{top_k} {recall:.3f}, "
+              f"{sketch['codes'].nbytes / 2**20:.1f} MiB codes, build {build:.2f} s)")
+
+
+if __name__ == "__main__":
+    main()
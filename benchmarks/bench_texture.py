@@ -0,0 +1,102 @@
+"""
+bench_texture.py - Texture extraction throughput
+
+Times texture extraction on the texture dataset three ways:
+  reference  - the standalone per-feature functions, one image at a time
+  per-image  - extract_texture_features with one reused TextureContext
+  batched    - extract_texture_features_batch over stacks of batch_size
+and reports the largest relative difference from the reference per block.
+It then times batched extraction under each named profile (TEXTURE_PROFILES)
+relative to 'default'.
+
+Usage: python benchmarks/bench_texture.py [batch_size] [images_folder]
+"""
+
+import os
+import sys
+import time
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from src.texture_features import (load_texture_image, gabor_filters, tamura_coarseness,
+                                  tamura_contrast, tamura_directionality, glcm_features,
+                                  TextureContext, extract_texture_features,
+                                  extract_texture_features_batch, split_texture_batch,
+                                  TEXTURE_PROFILES)
+
+
+def reference_features(path):
+    gray = load_texture_image(path)
+    direction_hist, directionality = tamura_directionality(gray)
+    return {
+        'gabor_features': gabor_filters(gray, num_orientations=8, num_scales=4),
+        'tamura_coarseness': tamura_coarseness(gray),
+        'tamura_contrast': tamura_contrast(gray),
+        'tamura_directionality': directionality,
+        'direction_histogram': direction_hist,
+        'glcm_features': glcm_features(gray),
+    }
+
+
+def max_relative_difference(reference, candidate):
+    worst = 0.0
+    for ref, other in zip(reference, candidate):
+        for key, value in ref.items():
+            value = np.atleast_1d(np.asarray(value, dtype=np.float64))
+            other_value = np.atleast_1d(np.asarray(other[key], dtype=np.float64))
+            scale = max(np.max(np.abs(value)), 1e-12)
+            worst = max(worst, np.max(np.abs(value - other_value)) / scale)
+    return worst
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run_batched(paths, batch_size, profile='default'):
+    context = TextureContext(capacity=batch_size, profile=profile)
+    features = []
+    for i in range(0, len(paths), batch_size):
+        chunk = paths[i:i + batch_size]
+        images = np.stack([load_texture_image(path, context.size) for path in chunk])
+        features.extend(split_texture_batch([os.path.basename(p) for p in chunk],
+                                            extract_texture_features_batch(images, context)))
+    return features
+
+
+def main():
+    batch_size = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    images_folder = sys.argv[2] if len(sys.argv) > 2 else 'data/Textures'
+    paths = sorted(str(p) for p in Path(images_folder).glob('*.jpg'))
+
+    reference, reference_time = timed(lambda: [reference_features(p) for p in paths])
+    context = TextureContext()
+    runs = {
+        'per-image': timed(lambda: [extract_texture_features(p, context) for p in paths]),
+        f'batched ({batch_size})': timed(lambda: run_batched(paths, batch_size)),
+    }
+
+    print(f"Images: {len(paths)}")
+    print(f"{'reference':14s} {reference_time / len(paths) * 1000:8.2f} ms/image")
+    for label, (features, elapsed) in runs.items():
+        print(f"{label:14s} {elapsed / len(paths) * 1000:8.2f} ms/image"
+              f"  ({reference_time / elapsed:.2f}x, max relative difference "
+              f"{max_relative_difference(reference, features):.2e})")
+
+    print(f"\nProfiles (batched, batch size {batch_size}):")
+    timings = {profile: timed(lambda: run_batched(paths, batch_size, profile))[1]
+               for profile in TEXTURE_PROFILES}
+    for profile, elapsed in timings.items():
+        settings = TEXTURE_PROFILES[profile]
+        print(f"{profile:14s} {elapsed / len(paths) * 1000:8.2f} ms/image"
+              f"  ({timings['default'] / elapsed:5.2f}x vs default, "
+              f"{settings['size']}px, {settings['num_orientations']}x{settings['num_scales']} Gabor, "
+              f"{'pyramid' if settings['pyramid'] else 'full resolution'})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,77 @@
+"""
+cli.py - Command-line interface for the CBIR system
+
+Without arguments an interactive menu is shown. Subcommands make it
+scriptable:
+
+  python cli.py extract shapes
+  python cli.py search shapes apple-1.gif --top-k 6 --format csv
+  python cli.py search textures Im01.jpg --mode chunked
+  python cli.py batch-search textures --input queries.txt --format json
+  python cli.py serve --watch
+
+`serve` keeps the indexes warm behind a Unix socket (default ./cbir.sock,
+or $CBIR_SOCKET); `search` and `batch-search` use it when it is running and
+fall back to loading features/ themselves otherwise. `--mode chunked` skips
+both and streams features/ in fixed-size chunks, for feature stores that do
+not fit in memory. After extracting, the
+daemon and a running web app (default http://localhost:5000, or
+$CBIR_APP_URL) are told to reload the collection.
+"""
+
+import argparse
+import contextlib
+import csv
+import json
 import os
+import signal
 import sys
+import time
+import urllib.request
 from pathlib import Path
 
-# Import all required functions
-from src.utils import load_features_from_json, save_features_to_json, load_image
-from src.shape_features import extract_shape_features, process_all_shape_images
-from src.texture_features import extract_texture_features, process_all_texture_images
-from src.shape_retrieval import retrieve_similar_shapes, visualize_shape_results
-from src.texture_retrieval import retrieve_similar_textures, visualize_texture_results
+from src.search_daemon import DEFAULT_SOCKET, request_daemon
+
+
+COLLECTION_NAMES = ('shapes', 'textures')
+OUTPUT_FORMATS = ('json', 'csv', 'table')
+DEFAULT_APP_URL = os.environ.get('CBIR_APP_URL', 'http://localhost:5000')
+
 
+# Ask a running web app to reload a collection from features/. False when
+# no app answers.
+def reload_app(collection_name, app_url=DEFAULT_APP_URL, timeout=30.0):
+    request = urllib.request.Request(
+        f"{app_url.rstrip('/')}/api/index/reload",
+        data=json.dumps({'collection': collection_name}).encode(),
+        headers={'Content-Type': 'application/json'}, method='POST')
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return bool(json.load(response).get('success'))
+    except (OSError, ValueError):
+        return False
+
+
+# Tell the search daemon and the web app that a collection was re-extracted
+def notify_reload(collection_name, socket_path=DEFAULT_SOCKET, app_url=DEFAULT_APP_URL):
+    from src.search_daemon import daemon_running
+
+    reloaded = {}
+    if daemon_running(socket_path):
+        request_daemon({'op': 'reload', 'collection': collection_name}, socket_path)
+        reloaded['daemon_reloaded'] = True
+    if reload_app(collection_name, app_url):
+        reloaded['app_reloaded'] = True
+    return reloaded
+
+
+def interactive_menu():
+    from src.shape_features import process_all_shape_images
+    from src.texture_features import process_all_texture_images
+    from src.catalog import TEXTURE_PROFILE
+    from src.shape_retrieval import retrieve_similar_shapes, visualize_shape_results
+    from src.texture_retrieval import retrieve_similar_textures, visualize_texture_results
 
-def main():
     print("=" * 60)
     print("CONTENT-BASED IMAGE RETRIEVAL SYSTEM")
     print("=" * 60)
@@ -29,14 +90,17 @@ def main():
             try:
                 process_all_shape_images("data/Formes", "features/Formes")
                 print("Shape features extracted successfully.")
+                notify_reload('shapes')
             except Exception as e:
                 print(f"Error: {e}")
             
         elif choice == '2':
             print("\nExtracting texture features...")
             try:
-                process_all_texture_images("data/Textures", "features/Textures")
+                process_all_texture_images("data/Textures", "features/Textures",
+                                           profile=TEXTURE_PROFILE)
                 print("Texture features extracted successfully.")
+                notify_reload('textures')
             except Exception as e:
                 print(f"Error: {e}")
             
@@ -126,11 +190,250 @@ def main():
             print("Invalid choice. Please try again.")
 
 
+# Answers for queries streamed from the features folder one chunk at a time
+def run_chunked_queries(collection_name, queries, top_k, chunk_size=1024):
+    from src.catalog import COLLECTIONS
+    from src.chunked_retrieval import retrieve_chunked
+    from src.search_daemon import format_results
+
+    collection = COLLECTIONS[collection_name]
+    weights = collection['block_weights']()
+    answers = []
+    for query in queries:
+        try:
+            results = retrieve_chunked(os.path.basename(query), collection['features_folder'],
+                                       collection['images_folder'], collection['extensions'],
+                                       collection['blocks'], weights, top_k, chunk_size)
+            answers.append({'query': query, 'results': format_results(results)})
+        except Exception as e:
+            answers.append({'query': query, 'error': str(e)})
+    return answers
+
+
+# Answers for queries, from the daemon when one is listening, else from a
+# freshly loaded index
+def run_queries(collection_name, queries, top_k, socket_path, use_daemon=True, prefilter=None):
+    if use_daemon:
+        try:
+            response = request_daemon({'op': 'search', 'collection': collection_name,
+                                       'queries': queries, 'top_k': top_k,
+                                       'prefilter': prefilter}, socket_path)
+        except OSError:
+            response = None
+        if response is not None:
+            if not response.get('success'):
+                raise RuntimeError(response.get('error'))
+            return response['answers']
+
+    from src.catalog import COLLECTIONS
+    from src.search_daemon import load_indexes, search_queries
+
+    collection = COLLECTIONS[collection_name]
+    index = load_indexes([collection])[collection_name]
+    return search_queries(index, collection, queries, top_k, prefilter)
+
+
+# Print answers as JSON, CSV (one row per result) or a table. Failed queries
+# are reported on stderr for CSV and table output.
+def write_answers(answers, output_format, single=False, out=None):
+    out = out or sys.stdout
+    if output_format == 'json':
+        json.dump(answers[0] if single else answers, out, indent=2)
+        out.write('\n')
+        return
+
+    writer = csv.writer(out) if output_format == 'csv' else None
+    if writer:
+        writer.writerow(['query', 'rank', 'name', 'distance', 'path'])
+    for answer in answers:
+        if 'error' in answer:
+            print(f"Error with {answer['query']}: {answer['error']}", file=sys.stderr)
+            continue
+        if not writer:
+            print(f"Query: {answer['query']}", file=out)
+        for result in answer['results']:
+            if writer:
+                writer.writerow([answer['query'], result['rank'], result['name'],
+                                 f"{result['distance']:.6f}", result['path']])
+            else:
+                print(f"{result['rank']}. {result['name']:20s} "
+                      f"Distance: {result['distance']:.6f}", file=out)
+
+
+# Query names for batch-search: arguments, then lines of --input ('-' for stdin)
+def read_queries(args):
+    queries = list(args.queries)
+    if args.input:
+        stream = sys.stdin if args.input == '-' else open(args.input)
+        with stream:
+            queries.extend(line.strip() for line in stream if line.strip())
+    return queries
+
+
+def command_extract(args):
+    from src.shape_features import process_all_shape_images
+    from src.texture_features import process_all_texture_images
+    from src.catalog import COLLECTIONS, TEXTURE_PROFILE
+
+    collection = COLLECTIONS[args.collection]
+    # Searches (here, in the daemon and in the web app) load only the served
+    # profile, so features of any other one would never be found
+    if args.profile is not None and args.profile != collection['profile']:
+        env = " (set CBIR_TEXTURE_PROFILE to change it)" if args.collection == 'textures' else ''
+        raise ValueError(f"{args.collection} are served with profile {collection['profile']}"
+                         f"{env}, not {args.profile}")
+    start = time.perf_counter()
+    # Progress goes to stderr so stdout carries only the JSON summary
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.collection == 'shapes':
+            process_all_shape_images(collection['images_folder'], collection['features_folder'])
+        else:
+            process_all_texture_images(collection['images_folder'], collection['features_folder'],
+                                       args.batch_size, TEXTURE_PROFILE)
+    summary = {
+        'collection': args.collection,
+        'features': len(list(Path(collection['features_folder']).glob('*.json'))),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+    summary.update(notify_reload(args.collection, args.socket, args.app_url))
+    print(json.dumps(summary))
+    return 0
+
+
+# Answers for a search subcommand in its --mode
+def search_mode_answers(args, queries):
+    if args.mode == 'chunked':
+        if args.prefilter is not None:
+            raise ValueError("--prefilter needs --mode snapshot")
+        return run_chunked_queries(args.collection, queries, args.top_k, args.chunk_size)
+    return run_queries(args.collection, queries, args.top_k, args.socket,
+                       not args.no_daemon, args.prefilter)
+
+
+def command_search(args):
+    answers = search_mode_answers(args, [args.query])
+    write_answers(answers, args.format, single=True)
+    return 1 if 'error' in answers[0] else 0
+
+
+def command_batch_search(args):
+    queries = read_queries(args)
+    if not queries:
+        print("No queries given", file=sys.stderr)
+        return 2
+    answers = search_mode_answers(args, queries)
+    write_answers(answers, args.format)
+    return 1 if any('error' in answer for answer in answers) else 0
+
+
+# Turn SIGTERM into KeyboardInterrupt so the daemon shuts down cleanly
+def _interrupt(signum, frame):
+    raise KeyboardInterrupt
+
+
+def command_serve(args):
+    from src.catalog import COLLECTIONS
+    from src.search_daemon import SearchDaemon
+
+    collections = [COLLECTIONS[name] for name in args.collections.split(',') if name]
+    server = SearchDaemon(args.socket, collections)
+    watcher = None
+    if args.watch:
+        from src.catalog import DUPLICATE_POLICY
+        from src.watcher import IngestWatcher, load_hash_indexes
+
+        def publish(name, items):
+            server.indexes[name].publish([(os.path.basename(path), path, features)
+                                          for path, features in items])
+
+        watcher = IngestWatcher(collections, on_publish=publish,
+                                hash_indexes=load_hash_indexes(collections),
+                                duplicate_policy=DUPLICATE_POLICY).start()
+
+    signal.signal(signal.SIGTERM, _interrupt)
+    print(f"Serving {', '.join(server.indexes)} on {args.socket}"
+          f"{' (watching for new images)' if watcher else ''}. Ctrl+C to stop.",
+          file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if watcher is not None:
+            watcher.stop()
+        server.server_close()
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Content-Based Image Retrieval System")
+    subparsers = parser.add_subparsers(dest='command')
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--socket', default=DEFAULT_SOCKET,
+                        help=f"search daemon socket (default: {DEFAULT_SOCKET})")
+
+    extract = subparsers.add_parser('extract', parents=[common],
+                                    help="extract features for a collection")
+    extract.add_argument('collection', choices=COLLECTION_NAMES)
+    extract.add_argument('--profile',
+                         help="expected extraction profile; must be the served one")
+    extract.add_argument('--batch-size', type=int, default=16)
+    extract.add_argument('--app-url', default=DEFAULT_APP_URL,
+                         help=f"web app to reload afterwards (default: {DEFAULT_APP_URL})")
+    extract.set_defaults(handler=command_extract)
+
+    for name, handler in (('search', command_search), ('batch-search', command_batch_search)):
+        search = subparsers.add_parser(name, parents=[common],
+                                       help=f"{name.replace('-', ' ')} by image name")
+        search.add_argument('collection', choices=COLLECTION_NAMES)
+        if name == 'search':
+            search.add_argument('query')
+        else:
+            search.add_argument('queries', nargs='*')
+            search.add_argument('--input', help="file with one query per line ('-' for stdin)")
+        search.add_argument('--top-k', type=int, default=6)
+        search.add_argument('--format', choices=OUTPUT_FORMATS, default='json')
+        search.add_argument('--prefilter', choices=['sketch'],
+                            help="Hamming sketch prefilter with exact re-rank")
+        search.add_argument('--no-daemon', action='store_true',
+                            help="always load features/ in this process")
+        search.add_argument('--mode', choices=['snapshot', 'chunked'], default='snapshot',
+                            help="snapshot: in-memory index (daemon or loaded here); "
+                                 "chunked: stream features/ without loading it whole")
+        search.add_argument('--chunk-size', type=int, default=1024,
+                            help="feature files scored per pass in chunked mode")
+        search.set_defaults(handler=handler)
+
+    serve = subparsers.add_parser('serve', parents=[common],
+                                  help="keep indexes warm behind a Unix socket")
+    serve.add_argument('--collections', default=','.join(COLLECTION_NAMES))
+    serve.add_argument('--watch', action='store_true',
+                       help="also ingest new images from the data folders")
+    serve.set_defaults(handler=command_serve)
+    return parser
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        interactive_menu()
+        return 0
+    args = build_parser().parse_args(argv)
+    if args.command is None:
+        interactive_menu()
+        return 0
+    try:
+        return args.handler(args)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+
 if __name__ == "__main__":
     try:
-        main()
+        sys.exit(main())
     except KeyboardInterrupt:
         print("\n\nProgram interrupted by user.")
     except Exception as e:
         print(f"\nCritical error: {e}")
-        sys.exit(1)
\ No newline at end of file
+        sys.exit(1)
@@ -0,0 +1,140 @@
+"""
+admission.py - Admission control for CPU-heavy work
+
+Each class of work (e.g. ingest, search) gets a WorkQueue: a fixed number
+of worker threads plus a bounded number of waiting slots. Work that does
+not fit is rejected immediately with Overloaded, carrying a Retry-After
+estimate, instead of piling up on request threads. Work carries a deadline:
+it is dropped if it is still queued when the deadline passes, and the
+caller stops waiting at the deadline.
+
+Queue depth, running count and queue wait times are kept per queue.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+
+class Overloaded(Exception):
+    """Raised when a work queue is full; retry_after is in whole seconds."""
+
+    def __init__(self, queue_name, retry_after):
+        super().__init__(f"{queue_name} queue is full, retry in {retry_after}s")
+        self.queue_name = queue_name
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """Raised when work did not finish before its deadline."""
+
+
+class WorkQueue:
+    """
+    Bounded worker pool for one class of work.
+
+    Args:
+        name (str): Queue name used in errors and metrics
+        max_workers (int): Work items run concurrently
+        max_queue (int): Work items allowed to wait for a worker
+        timeout (float): Default seconds from submission to deadline
+    """
+
+    def __init__(self, name, max_workers, max_queue, timeout=30.0):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix=f'{name}-worker')
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.waits = deque(maxlen=1000)
+        self.service_times = deque(maxlen=1000)
+        self.counters = {'admitted': 0, 'rejected': 0, 'completed': 0, 'failed': 0,
+                         'expired': 0, 'timed_out': 0}
+
+    # Seconds until a slot is likely to free up, from recent service times
+    def _retry_after(self):
+        service = (sum(self.service_times) / len(self.service_times)
+                   if self.service_times else 1.0)
+        backlog = (self.queued + self.running) / self.max_workers
+        return max(1, math.ceil(service * backlog))
+
+    # Worker side: skip expired work, time the wait and the run
+    def _execute(self, fn, args, kwargs, submitted, deadline):
+        started = time.monotonic()
+        with self.lock:
+            self.queued -= 1
+            self.waits.append(started - submitted)
+            if started >= deadline:
+                self.counters['expired'] += 1
+                raise DeadlineExceeded(f"Deadline passed while queued for {self.name}")
+            self.running += 1
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException:
+            with self.lock:
+                self.counters['failed'] += 1
+            raise
+        finally:
+            with self.lock:
+                self.running -= 1
+                self.service_times.append(time.monotonic() - started)
+        with self.lock:
+            self.counters['completed'] += 1
+        return result
+
+    def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn on the pool and wait for its result.
+
+        Raises:
+            Overloaded: If all workers and waiting slots are taken
+            DeadlineExceeded: If the result is not ready within timeout
+                (default self.timeout) seconds
+        """
+        submitted = time.monotonic()
+        timeout = self.timeout if timeout is None else min(timeout, self.timeout)
+        deadline = submitted + timeout
+        with self.lock:
+            if self.queued + self.running >= self.max_workers + self.max_queue:
+                self.counters['rejected'] += 1
+                raise Overloaded(self.name, self._retry_after())
+            self.queued += 1
+            self.counters['admitted'] += 1
+
+        future = self.executor.submit(self._execute, fn, args, kwargs, submitted, deadline)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeout:
+            # Still queued: cancelled here and never run. Already running:
+            # it finishes in the background, holding its worker until then.
+            if future.cancel():
+                with self.lock:
+                    self.queued -= 1
+                    self.counters['expired'] += 1
+            else:
+                with self.lock:
+                    self.counters['timed_out'] += 1
+            raise DeadlineExceeded(f"{self.name} work did not finish within {timeout:.1f}s")
+
+    def stats(self):
+        with self.lock:
+            waits = sorted(self.waits)
+            return dict(
+                self.counters,
+                queue_depth=self.queued,
+                running=self.running,
+                max_workers=self.max_workers,
+                max_queue=self.max_queue,
+                wait_mean=sum(waits) / len(waits) if waits else 0.0,
+                wait_p95=waits[min(len(waits) - 1, int(0.95 * len(waits)))] if waits else 0.0,
+                wait_max=waits[-1] if waits else 0.0,
+            )
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,264 @@
+"""
+bulk_ingest.py - Bulk image ingestion from multi-file uploads and archives
+
+Images arrive as (file name, bytes) pairs, either uploaded directly or read
+one member at a time from a zip/tar archive (archives are never unpacked as
+a whole). Each image is staged to disk and extracted in micro-batches on a
+worker pool, with a bounded number of batches in flight. Finished images are
+moved into the collection's image folder, their features are saved, and all
+of them are published to the index in a single call. With a hash index,
+exact duplicates reuse existing features (or those of an identical image
+earlier in the same upload) and near duplicates are flagged or skipped
+before any extraction.
+"""
+
+import os
+import shutil
+import tarfile
+import tempfile
+import zipfile
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from werkzeug.utils import secure_filename
+from src.utils import save_features_to_json
+from src.dedup import check_duplicate, content_hash
+
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+# True when a file name looks like a supported archive
+def is_archive(filename):
+    return filename.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def iter_archive_members(fileobj, filename, max_member_size=None):
+    """
+    Read the regular files of a zip or tar archive one at a time.
+
+    Zip archives need a seekable file object; tar archives are read as a
+    stream. Members larger than max_member_size are yielded with data None.
+
+    Args:
+        fileobj: Open binary file object of the archive
+        filename (str): Archive name, used to pick the format
+
+    Yields:
+        tuple: (member_name, data) with data as bytes, or None if too large
+    """
+    if filename.lower().endswith('.zip'):
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                if max_member_size is not None and info.file_size > max_member_size:
+                    yield info.filename, None
+                else:
+                    yield info.filename, archive.read(info)
+    else:
+        with tarfile.open(fileobj=fileobj, mode='r|*') as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                if max_member_size is not None and member.size > max_member_size:
+                    yield member.name, None
+                else:
+                    yield member.name, archive.extractfile(member).read()
+
+
+# Extract a micro-batch. Uses the collection's batch extractor when it has
+# one, falling back to one image at a time so failures are reported per file.
+def _extract_batch(collection, paths):
+    extract_batch = collection.get('extract_batch')
+    if extract_batch is not None and len(paths) > 1:
+        try:
+            return [(path, features, None) for path, features in zip(paths, extract_batch(paths))]
+        except Exception:
+            pass
+
+    results = []
+    for path in paths:
+        try:
+            results.append((path, collection['extract'](path), None))
+        except Exception as e:
+            results.append((path, None, str(e)))
+    return results
+
+
+def ingest_files(files, collection, publish, staging_folder, max_workers=None,
+                 batch_size=16, max_file_size=None, hash_index=None, duplicate_policy='flag',
+                 validate=None, executor=None):
+    """
+    Extract, store and publish many images in one go.
+
+    Args:
+        files: Iterable of (file_name, data) pairs; data None marks a file
+            rejected upstream (e.g. too large), an exception one that could
+            not be read (e.g. a corrupt archive)
+        collection (dict): Entry of catalog.COLLECTIONS
+        publish (callable): Called once with all (image_name, image_path,
+            features) triples, e.g. FeatureIndex.publish; returns a version
+        staging_folder (str): Where images wait for extraction
+        max_workers (int): Extraction threads
+        batch_size (int): Images per extraction task
+        max_file_size (int): Files larger than this are rejected
+        hash_index (HashIndex): Duplicate detection for the collection
+        duplicate_policy (str): 'flag' or 'skip' for near duplicates
+        validate (callable): Called as validate(image_name, features) before
+            anything is stored; raises for features publish would refuse
+            (e.g. FeatureIndex.validate)
+        executor (Executor): Shared pool to extract on, so concurrent calls
+            share max_workers threads (default: a pool for this call only)
+
+    Returns:
+        dict: 'results' (per-file status in input order, with
+            'duplicate'/'duplicate_of' for duplicates), 'counts',
+            'version' (index version containing the images, or None) and,
+            if the stored images could not be published, 'publish_error'
+    """
+    os.makedirs(staging_folder, exist_ok=True)
+    # Staged files keep their final names, since extractors record them
+    staging = tempfile.mkdtemp(prefix='bulk-', dir=staging_folder)
+    max_workers = max_workers or os.cpu_count() or 1
+    results, staged, published, accepted, hashes = [], {}, [], set(), {}
+    # Images of this upload waiting for extraction, by content hash, and the
+    # identical images (same bytes) that will take their features
+    pending, followers = {}, {}
+
+    def finish(batch_results):
+        for path, features, error in batch_results:
+            status = staged.pop(path)
+            waiting = followers.pop(path, None)
+            if waiting is not None:
+                del pending[hashes[path][0]]
+            if error is None:
+                try:
+                    if validate is not None:
+                        validate(status['filename'], features)
+                    image_path = os.path.join(collection['images_folder'], status['filename'])
+                    os.makedirs(collection['images_folder'], exist_ok=True)
+                    os.replace(path, image_path)
+                    save_features_to_json(features, os.path.join(
+                        collection['features_folder'], Path(status['filename']).stem + '.json'))
+                    published.append((status['filename'], image_path, features))
+                    if hash_index is not None:
+                        hash_index.add(status['filename'], *hashes.pop(path))
+                    status['status'] = 'ok'
+                except Exception as e:
+                    error = str(e)
+            if error is not None:
+                status['status'] = 'error'
+                status['error'] = error
+                if os.path.exists(path):
+                    os.remove(path)
+            # Identical images share the outcome without being extracted again
+            finish([(other, None if error is not None
+                     else dict(features, image_name=staged[other]['filename']), error)
+                    for other in waiting or []])
+
+    in_flight = deque()
+    completed = False
+    try:
+        with (ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='bulk')
+              if executor is None else nullcontext(executor)) as executor:
+            batch = []
+
+            def submit():
+                in_flight.append(executor.submit(_extract_batch, collection, list(batch)))
+                batch.clear()
+                while len(in_flight) >= 2 * max_workers:
+                    finish(in_flight.popleft().result())
+
+            for file_name, data in files:
+                filename = secure_filename(os.path.basename(file_name))
+                status = {'file': file_name, 'filename': filename}
+                results.append(status)
+                if isinstance(data, Exception):
+                    status.update(status='error', error=str(data) or type(data).__name__)
+                elif Path(filename).suffix.lower() not in collection['extensions']:
+                    status.update(status='skipped', error='Invalid file type')
+                elif data is None or (max_file_size is not None and len(data) > max_file_size):
+                    status.update(status='error', error='File too large')
+                elif filename in accepted:
+                    status.update(status='skipped', error='Duplicate file name in upload')
+                else:
+                    accepted.add(filename)
+                    path = os.path.join(staging, filename)
+                    with open(path, 'wb') as f:
+                        f.write(data)
+                    staged[path] = status
+                    if hash_index is not None:
+                        try:
+                            leader = pending.get(content_hash(path))
+                            if leader is None:
+                                duplicate = check_duplicate(
+                                    hash_index, collection['features_folder'], path, filename,
+                                    duplicate_policy, collection.get('profile'))
+                        except Exception as e:
+                            finish([(path, None, str(e))])
+                            continue
+                        if leader is not None:
+                            # Same bytes as an image of this upload not extracted yet
+                            hashes[path] = hashes[leader]
+                            status.update(duplicate='exact', duplicate_of=staged[leader]['filename'])
+                            followers[leader].append(path)
+                            continue
+                        hashes[path] = duplicate['hashes']
+                        if duplicate['duplicate'] is not None:
+                            status.update(duplicate=duplicate['duplicate'],
+                                          duplicate_of=duplicate['duplicate_of'])
+                        if duplicate['action'] == 'skip':
+                            del staged[path]
+                            os.remove(path)
+                            status.update(status='skipped', error='Near duplicate')
+                            continue
+                        if duplicate['action'] == 'reuse':
+                            finish([(path, duplicate['features'], None)])
+                            continue
+                        pending[duplicate['hashes'][0]] = path
+                        followers[path] = []
+                    batch.append(path)
+                    if len(batch) == batch_size:
+                        submit()
+
+            if batch:
+                submit()
+            while in_flight:
+                finish(in_flight.popleft().result())
+        completed = True
+    finally:
+        # Batches of an aborted call that have not started are dropped
+        for future in in_flight:
+            future.cancel()
+        shutil.rmtree(staging, ignore_errors=True)
+        if hash_index is not None:
+            hash_index.save()
+        if not completed and published:
+            # Images already moved into the collection are still published,
+            # without hiding the error that stopped ingestion
+            try:
+                publish(published)
+            except Exception as e:
+                print(f"Error publishing {len(published)} images of an aborted bulk ingest: {e}")
+
+    # Stored images stay in the collection when publishing fails; the index
+    # picks them up on its next reload
+    version, publish_error = None, None
+    if published:
+        try:
+            version = publish(published)
+        except Exception as e:
+            publish_error = str(e)
+
+    counts = {'total': len(results)}
+    for status in results:
+        counts[status['status']] = counts.get(status['status'], 0) + 1
+        if 'duplicate' in status:
+            key = f"{status['duplicate']}_duplicates"
+            counts[key] = counts.get(key, 0) + 1
+    report = {'results': results, 'counts': counts, 'version': version}
+    if publish_error is not None:
+        report['publish_error'] = publish_error
+    return report
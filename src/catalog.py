@@ -0,0 +1,59 @@
+"""
+catalog.py - Image collections served by the system
+
+Each collection ties an image folder to its features folder, extractor
+('extract_batch', when present, extracts a list of paths at once), feature
+layout and distance, so tools that work on any collection (the web
+app, the ingest watcher, the evaluation harness) share one definition.
+"""
+
+import os
+from functools import partial
+from src.shape_features import extract_shape_features, SHAPE_PROFILE
+from src.texture_features import extract_texture_features, extract_texture_features_files
+from src.shape_retrieval import (SHAPE_BLOCKS, shape_block_weights,
+                                 compute_shape_distance, retrieve_similar_shapes)
+from src.texture_retrieval import (TEXTURE_BLOCKS, texture_block_weights,
+                                   compute_texture_distance, retrieve_similar_textures)
+
+
+SHAPE_EXTENSIONS = ['.gif', '.png', '.jpg', '.jpeg']
+TEXTURE_EXTENSIONS = ['.jpg', '.jpeg', '.png']
+
+# Texture extraction profile of the served collection (see TEXTURE_PROFILES);
+# changing it requires re-extracting features/Textures
+TEXTURE_PROFILE = os.environ.get('CBIR_TEXTURE_PROFILE', 'default')
+
+# What happens to near-duplicate images at ingest (see dedup.DUPLICATE_POLICIES):
+# 'flag' extracts them and reports the match, 'skip' does not ingest them
+DUPLICATE_POLICY = os.environ.get('CBIR_DUPLICATE_POLICY', 'flag')
+
+COLLECTIONS = {
+    'shapes': {
+        'name': 'shapes',
+        'images_folder': 'data/Formes',
+        'features_folder': 'features/Formes',
+        'hash_index': 'features/hashes/shapes.json',
+        'extensions': SHAPE_EXTENSIONS,
+        'extract': extract_shape_features,
+        'profile': SHAPE_PROFILE,
+        'blocks': SHAPE_BLOCKS,
+        'block_weights': shape_block_weights,
+        'distance': compute_shape_distance,
+        'retrieve': retrieve_similar_shapes,
+    },
+    'textures': {
+        'name': 'textures',
+        'images_folder': 'data/Textures',
+        'features_folder': 'features/Textures',
+        'hash_index': 'features/hashes/textures.json',
+        'extensions': TEXTURE_EXTENSIONS,
+        'extract': partial(extract_texture_features, profile=TEXTURE_PROFILE),
+        'extract_batch': partial(extract_texture_features_files, profile=TEXTURE_PROFILE),
+        'profile': TEXTURE_PROFILE,
+        'blocks': TEXTURE_BLOCKS,
+        'block_weights': texture_block_weights,
+        'distance': compute_texture_distance,
+        'retrieve': retrieve_similar_textures,
+    },
+}
@@ -0,0 +1,146 @@
+"""
+chunked_retrieval.py - Out-of-core retrieval over a features folder
+
+Streams the feature files in fixed-size chunks instead of loading the whole
+collection: each chunk is stacked into one of two preallocated matrices,
+scored with one vectorized blockwise distance pass, and only its k best rows
+are merged into a bounded top-k heap. Peak memory is O(chunk_size + top_k)
+whatever the collection size. The next chunk can be read into the other
+matrix on a background thread while the current one is scored.
+"""
+
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+import numpy as np
+from src.utils import (load_features_from_json, feature_vector, block_offsets,
+                       blockwise_distances, top_k_smallest, feature_profile)
+
+
+_DONE = object()
+
+
+# Feature file paths of a folder, listed lazily (no full directory listing in memory)
+def _iter_feature_files(features_folder):
+    with os.scandir(features_folder) as entries:
+        for entry in entries:
+            if entry.name.endswith('.json') and entry.is_file():
+                yield entry.path
+
+
+# Image matching a feature file, or None if it no longer exists
+def _image_for(json_path, images_folder, extensions):
+    stem = Path(json_path).stem
+    for ext in extensions:
+        image_path = os.path.join(images_folder, stem + ext)
+        if os.path.exists(image_path):
+            return image_path
+    return None
+
+
+def iter_feature_chunks(features_folder, images_folder, extensions, blocks,
+                        chunk_size=1024, profile=None):
+    """
+    Stream a features folder as stacked chunks.
+
+    Args:
+        features_folder (str): Folder of per-image JSON feature files
+        images_folder (str): Folder of the images; features without an
+            image are skipped
+        extensions (list): Image extensions to look for
+        blocks (list): (block_name, keys) layout of the vectors
+        chunk_size (int): Rows per chunk
+        profile (str): Keep only features from this extraction profile
+
+    Yields:
+        tuple: (names, paths, matrix) with at most chunk_size rows. Chunks
+            alternate between two buffers, so a matrix is overwritten once
+            the chunk after next is requested.
+    """
+    names, paths, buffers, matrix = [], [], None, None
+    for json_path in _iter_feature_files(features_folder):
+        image_path = _image_for(json_path, images_folder, extensions)
+        if image_path is None:
+            continue
+        features = load_features_from_json(json_path)
+        if profile is not None and feature_profile(features) != profile:
+            continue
+        vector = feature_vector(features, blocks)
+        if buffers is None:
+            buffers = [np.empty((chunk_size, vector.size)) for _ in range(2)]
+            matrix = buffers[0]
+        matrix[len(names)] = vector
+        names.append(os.path.basename(image_path))
+        paths.append(image_path)
+        if len(names) == chunk_size:
+            yield names, paths, matrix
+            matrix = buffers[1] if matrix is buffers[0] else buffers[0]
+            names, paths = [], []
+    if names:
+        yield names, paths, matrix[:len(names)]
+
+
+# Yield the items of an iterable while the next one is produced on a
+# background thread (one item of read-ahead)
+def read_ahead(iterable):
+    iterator = iter(iterable)
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix='read-ahead') as executor:
+        future = executor.submit(next, iterator, _DONE)
+        while True:
+            item = future.result()
+            if item is _DONE:
+                return
+            future = executor.submit(next, iterator, _DONE)
+            yield item
+
+
+def retrieve_chunked(query_image_name, features_folder, images_folder, extensions,
+                     blocks, block_weights, top_k=6, chunk_size=1024, prefetch=True):
+    """
+    Retrieve the top_k images closest to a query by streaming the features folder.
+
+    Only features from the query's extraction profile are compared. Ties are
+    broken by image name, so results do not depend on directory order.
+
+    Args:
+        query_image_name (str): Query image file name
+        block_weights (np.ndarray): Weight of each block's distance
+        chunk_size (int): Rows scored per vectorized pass
+        prefetch (bool): Read the next chunk on a background thread
+
+    Returns:
+        list: (image_name, distance, image_path) tuples, closest first
+    """
+    query_json = os.path.join(features_folder, Path(query_image_name).stem + '.json')
+    if not os.path.exists(query_json):
+        raise ValueError(f"Feature file not found: {query_json}")
+
+    query_features = load_features_from_json(query_json)
+    query_vector = feature_vector(query_features, blocks)
+    offsets = block_offsets(query_features, blocks)
+
+    chunks = iter_feature_chunks(features_folder, images_folder, extensions, blocks,
+                                 chunk_size, feature_profile(query_features))
+    if prefetch:
+        chunks = read_ahead(chunks)
+
+    best = []
+    for names, paths, matrix in chunks:
+        if matrix.shape[1] != query_vector.size:
+            raise ValueError(f"Feature layout in {features_folder} does not match "
+                             f"{query_image_name}")
+        distances = blockwise_distances(matrix, query_vector, offsets) @ block_weights
+        if query_image_name in names:
+            distances[names.index(query_image_name)] = np.inf
+        # Keep every row tied with the chunk's k-th best, so the heap (ordered
+        # by distance, then name) decides ties rather than file order
+        order = top_k_smallest(distances, top_k)
+        if not len(order):
+            continue
+        rows = np.flatnonzero(distances <= distances[order[-1]])
+        candidates = [(float(distances[i]), names[i], paths[i])
+                      for i in rows if np.isfinite(distances[i])]
+        best = heapq.nsmallest(top_k, best + candidates)
+
+    return [(name, dist, path) for dist, name, path in best]
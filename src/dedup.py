@@ -0,0 +1,224 @@
+"""
+dedup.py - Duplicate detection at ingest
+
+Every ingested image gets two hashes: a SHA-256 of its bytes (exact
+duplicates) and a 64-bit dHash of a 9x8 grayscale downscale (re-encoded,
+resized or lightly edited copies). Hashes are kept in a HashIndex per
+collection, persisted next to the features folder. Ingest paths consult the
+index before extracting:
+  exact duplicate   the features of the matching image are reused
+  near duplicate    flagged and extracted ('flag') or not ingested ('skip')
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import cv2
+from src.utils import (load_image, load_features_from_json, save_features_to_json,
+                       feature_profile)
+from src.sketch import hamming_distances
+
+
+DUPLICATE_POLICIES = ('flag', 'skip')
+
+
+# SHA-256 of a file's bytes
+def content_hash(image_path):
+    digest = hashlib.sha256()
+    with open(image_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Difference hash: sign of horizontal gradients on a (hash_size + 1) x hash_size downscale
+def dhash(gray, hash_size=8):
+    small = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int(np.packbits(bits).view('>u8')[0])
+
+
+# (content hash, perceptual hash) of an image file
+def image_hashes(image_path):
+    gray, _ = load_image(image_path)
+    return content_hash(image_path), dhash(gray)
+
+
+class HashIndex:
+    """
+    Content and perceptual hashes of the images of one collection.
+
+    Args:
+        path (str): JSON file the index is saved to (None keeps it in memory)
+        max_distance (int): Largest dHash Hamming distance counted as a
+            near duplicate
+    """
+
+    def __init__(self, path=None, max_distance=4):
+        self.path = path
+        self.max_distance = max_distance
+        self.lock = threading.Lock()
+        self.entries = {}
+        self.by_content = {}
+        self.names = []
+        self.positions = {}
+        self.codes = np.zeros((16, 1), dtype=np.uint64, order='F')
+        self.counters = {'exact_duplicates': 0, 'near_duplicates': 0, 'unique': 0}
+
+    def __len__(self):
+        return len(self.names)
+
+    # Add or replace the hashes of an image
+    def add(self, name, sha256, perceptual):
+        with self.lock:
+            self._discard(name)
+            if len(self.names) == len(self.codes):
+                codes = np.zeros((2 * len(self.codes), 1), dtype=np.uint64, order='F')
+                codes[:len(self.names)] = self.codes
+                self.codes = codes
+            self.codes[len(self.names), 0] = perceptual
+            self.positions[name] = len(self.names)
+            self.names.append(name)
+            self.entries[name] = (sha256, perceptual)
+            self.by_content.setdefault(sha256, []).append(name)
+
+    def discard(self, name):
+        with self.lock:
+            self._discard(name)
+
+    # Swap-remove name from the code table
+    def _discard(self, name):
+        if name not in self.entries:
+            return
+        sha256, _ = self.entries.pop(name)
+        names = self.by_content[sha256]
+        names.remove(name)
+        if not names:
+            del self.by_content[sha256]
+        row = self.positions.pop(name)
+        last = self.names.pop()
+        if row < len(self.names):
+            self.codes[row] = self.codes[len(self.names)]
+            self.names[row] = last
+            self.positions[last] = row
+
+    def match(self, name, sha256, perceptual):
+        """
+        Look up an incoming image and count the outcome.
+
+        An image is never a duplicate of itself (same name), so edited
+        re-uploads are treated as updates and re-extracting a known image
+        is not counted as a duplicate.
+
+        Returns:
+            tuple: ('exact', match_name, 0), ('near', match_name, distance)
+                or (None, None, None)
+        """
+        with self.lock:
+            result = (None, None, None)
+            others = [other for other in self.by_content.get(sha256, ()) if other != name]
+            if others:
+                result = ('exact', others[0], 0)
+            elif self.names:
+                distances = hamming_distances(self.codes[:len(self.names)],
+                                              np.array([perceptual], dtype=np.uint64))
+                if name in self.positions:
+                    distances[self.positions[name]] = np.iinfo(distances.dtype).max
+                row = int(np.argmin(distances))
+                if distances[row] <= self.max_distance:
+                    result = ('near', self.names[row], int(distances[row]))
+
+            key = {'exact': 'exact_duplicates', 'near': 'near_duplicates'}.get(result[0], 'unique')
+            self.counters[key] += 1
+            return result
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, images=len(self.names))
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            entries = {name: {'sha256': sha256, 'dhash': f'{perceptual:016x}'}
+                       for name, (sha256, perceptual) in self.entries.items()}
+        save_features_to_json(entries, self.path)
+
+
+# Hash index of a collection, loaded from disk and brought in sync with its
+# images folder (missing images hashed, vanished ones dropped)
+def load_hash_index(path, images_folder, extensions, max_distance=4):
+    hash_index = HashIndex(path, max_distance)
+    stored = {}
+    if path is not None and os.path.exists(path):
+        with open(path) as f:
+            stored = json.load(f)
+
+    changed = False
+    for ext in extensions:
+        for image_path in sorted(Path(images_folder).glob(f'*{ext}')):
+            entry = stored.pop(image_path.name, None)
+            if entry is not None:
+                hash_index.add(image_path.name, entry['sha256'], int(entry['dhash'], 16))
+                continue
+            try:
+                hash_index.add(image_path.name, *image_hashes(str(image_path)))
+                changed = True
+            except Exception as e:
+                print(f"Error with {image_path.name}: {str(e)}")
+
+    if changed or stored:
+        hash_index.save()
+    return hash_index
+
+
+# Features of an indexed image relabelled for a duplicate, or None if the
+# original has no features file or they are of another profile than profile
+def reuse_features(features_folder, match_name, image_name, profile=None):
+    json_path = os.path.join(features_folder, Path(match_name).stem + '.json')
+    if not os.path.exists(json_path):
+        return None
+    features = load_features_from_json(json_path)
+    if profile is not None and feature_profile(features) != profile:
+        return None
+    features['image_name'] = image_name
+    return features
+
+
+def check_duplicate(hash_index, features_folder, image_path, image_name=None, policy='flag',
+                    profile=None):
+    """
+    Classify an incoming image against a collection's hash index.
+
+    Args:
+        hash_index (HashIndex): Index of the target collection
+        features_folder (str): Features of the indexed images
+        image_path (str): Incoming image (possibly still staged elsewhere)
+        image_name (str): Name it will be stored under (default: its basename)
+        policy (str): 'flag' or 'skip' for near duplicates
+        profile (str): Extraction profile features must have to be reused
+
+    Returns:
+        dict: 'action' ('extract', 'reuse' or 'skip'), 'duplicate'
+            ('exact', 'near' or None), 'duplicate_of', 'distance',
+            'features' (for 'reuse'), and 'hashes' to register once stored
+    """
+    if policy not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy: {policy} (expected one of {DUPLICATE_POLICIES})")
+
+    image_name = image_name or os.path.basename(image_path)
+    hashes = image_hashes(image_path)
+    kind, match_name, distance = hash_index.match(image_name, *hashes)
+    result = {'action': 'extract', 'duplicate': kind, 'duplicate_of': match_name,
+              'distance': distance, 'features': None, 'hashes': hashes}
+
+    if kind == 'exact':
+        features = reuse_features(features_folder, match_name, image_name, profile)
+        if features is not None:
+            result.update(action='reuse', features=features)
+    elif kind == 'near' and policy == 'skip':
+        result['action'] = 'skip'
+    return result
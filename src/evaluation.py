@@ -0,0 +1,212 @@
+"""
+evaluation.py - Retrieval quality vs. speed harness
+
+Runs every image of a collection as a query through each retrieval backend
+and reports, side by side:
+  P@k           fraction of the top k sharing the query's class label
+  mAP@k         mean average precision over the top k
+  recall@k      overlap with the exact top k (ties at the k-th distance count)
+  queries/sec   throughput of the backend
+
+The exact baseline is computed from vectorized all-pairs distances. Class
+labels come from file names ('apple-3.gif' -> 'apple'). P@k and mAP@k are
+averaged over labelled queries only, and unlabelled images (e.g. uploads
+such as 'demo.png') are never relevant; collections without any labels only
+get recall and throughput.
+
+Backends take an optional parameter after a colon, e.g. 'sketch:128' for a
+128-bit Hamming prefilter. Sketch backends re-rank 2 * k candidates unless
+given as 'sketch:BITS:CANDIDATES'; a candidate count close to the collection
+size would make their recall trivially 1.0.
+
+Usage: python -m src.evaluation [shapes|textures] [--k 6] [--backends scan,snapshot,sketch:64:12]
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+import numpy as np
+from scipy.spatial.distance import cdist
+from src.catalog import COLLECTIONS
+from src.feature_index import load_snapshot, search_snapshot
+from src.sketch import build_sketch_index, search_sketch
+from src.chunked_retrieval import retrieve_chunked
+
+
+LABEL_PATTERN = re.compile(r'^(.+)-\d+$')
+
+
+# Class label encoded in an image name, or None
+def class_label(image_name):
+    match = LABEL_PATTERN.match(os.path.splitext(image_name)[0])
+    return match.group(1) if match else None
+
+
+# Exact (N, N) distances between all indexed images, one cdist per block
+def all_pairs_distances(snapshot, block_weights):
+    distances = np.zeros((len(snapshot), len(snapshot)))
+    bounds = list(snapshot.offsets) + [snapshot.matrix.shape[1]]
+    for b, weight in enumerate(block_weights):
+        block = snapshot.matrix[:, bounds[b]:bounds[b + 1]]
+        distances += weight * cdist(block, block)
+    return distances
+
+
+# Backend factories: (collection, snapshot, param) -> search(query_name, top_k) -> names,
+# param being the text after ':' in the backend spec (or None)
+def _scan_backend(collection, snapshot, param=None):
+    def search(query_name, top_k):
+        results = collection['retrieve'](query_name, collection['features_folder'],
+                                         collection['images_folder'], top_k)
+        return [name for name, _, _ in results]
+    return search
+
+
+def _snapshot_backend(collection, snapshot, param=None):
+    weights = collection['block_weights']()
+
+    def search(query_name, top_k):
+        return [name for name, _, _ in search_snapshot(snapshot, query_name, weights, top_k)]
+    return search
+
+
+# Streaming scan of the features folder; param is the chunk size (default 1024)
+def _chunked_backend(collection, snapshot, param=None):
+    weights = collection['block_weights']()
+
+    def search(query_name, top_k):
+        results = retrieve_chunked(query_name, collection['features_folder'],
+                                   collection['images_folder'], collection['extensions'],
+                                   collection['blocks'], weights, top_k, int(param or 1024))
+        return [name for name, _, _ in results]
+    return search
+
+
+# Hamming prefilter + exact re-rank; param is 'BITS' or 'BITS:CANDIDATES'
+# (default 64 bits, 2 * top_k candidates)
+def _sketch_factory(method):
+    def factory(collection, snapshot, param=None):
+        weights = collection['block_weights']()
+        bits, _, candidates = (param or '64').partition(':')
+        sketch = build_sketch_index(snapshot, weights, int(bits), method)
+
+        def search(query_name, top_k):
+            return [name for name, _, _ in search_sketch(
+                snapshot, sketch, query_name, weights, top_k,
+                int(candidates) if candidates else 2 * top_k)]
+        return search
+    return factory
+
+
+BACKENDS = {
+    'scan': _scan_backend,
+    'snapshot': _snapshot_backend,
+    'chunked': _chunked_backend,
+    'sketch': _sketch_factory('srp'),
+    'sketch-itq': _sketch_factory('itq'),
+}
+
+
+# Average precision of one ranked list against a relevance set, cut at k
+def average_precision(ranked_labels, label, num_relevant, k):
+    hits, total = 0, 0.0
+    for i, candidate in enumerate(ranked_labels[:k], 1):
+        if candidate == label:
+            hits += 1
+            total += hits / i
+    return total / min(num_relevant, k) if num_relevant else 0.0
+
+
+# Quality metrics of result lists against labels and the exact ranking
+def score_results(snapshot, exact, results, k):
+    labels = [class_label(name) for name in snapshot.names]
+    precisions, aps, recalls = [], [], []
+
+    for query_row, names in enumerate(results):
+        rows = [snapshot.positions[name] for name in names]
+        others = np.delete(exact[query_row], query_row)
+        kth = np.sort(others)[min(k, len(others)) - 1]
+        tolerance = 1e-9 * max(1.0, abs(kth))
+        recalls.append(np.mean([exact[query_row, r] <= kth + tolerance for r in rows])
+                       if rows else 0.0)
+
+        label = labels[query_row]
+        if label is not None:
+            ranked = [labels[r] for r in rows]
+            num_relevant = labels.count(label) - 1
+            precisions.append(np.mean([c == label for c in ranked]) if ranked else 0.0)
+            aps.append(average_precision(ranked, label, num_relevant, k))
+
+    return {
+        'precision_at_k': float(np.mean(precisions)) if precisions else None,
+        'map_at_k': float(np.mean(aps)) if aps else None,
+        'recall_at_k': float(np.mean(recalls)),
+    }
+
+
+# Evaluate the exact baseline and every requested backend on one collection
+def evaluate_collection(collection, k=6, backends=None, snapshot=None):
+    if snapshot is None:
+        snapshot = load_snapshot(collection['features_folder'], collection['images_folder'],
+                                 collection['extensions'], collection['blocks'])
+    if len(snapshot) < 2:
+        raise ValueError(f"Need at least two indexed images in {collection['features_folder']}")
+
+    start = time.perf_counter()
+    exact = all_pairs_distances(snapshot, collection['block_weights']())
+    masked = exact + np.diag(np.full(len(snapshot), np.inf))
+    exact_results = [[snapshot.names[r] for r in np.argsort(row, kind='stable')[:k]]
+                     for row in masked]
+    elapsed = time.perf_counter() - start
+
+    report = [dict(backend='exact', queries_per_sec=len(snapshot) / elapsed,
+                   **score_results(snapshot, exact, exact_results, k))]
+
+    for spec in backends or list(BACKENDS):
+        name, _, param = spec.partition(':')
+        search = BACKENDS[name](collection, snapshot, param or None)
+        start = time.perf_counter()
+        results = [search(query, k) for query in snapshot.names]
+        elapsed = time.perf_counter() - start
+        report.append(dict(backend=spec, queries_per_sec=len(snapshot) / elapsed,
+                           **score_results(snapshot, exact, results, k)))
+
+    return report
+
+
+def format_report(report, k):
+    def cell(value):
+        return f"{value:10.4f}" if value is not None else f"{'-':>10s}"
+
+    lines = [f"{'backend':14s} {'P@' + str(k):>10s} {'mAP@' + str(k):>10s} "
+             f"{'recall@' + str(k):>10s} {'queries/s':>12s}"]
+    for row in report:
+        lines.append(f"{row['backend']:14s} {cell(row['precision_at_k'])} "
+                     f"{cell(row['map_at_k'])} {cell(row['recall_at_k'])} "
+                     f"{row['queries_per_sec']:12.1f}")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate retrieval quality vs. speed")
+    parser.add_argument('collection', nargs='?', default='shapes', choices=sorted(COLLECTIONS))
+    parser.add_argument('--k', type=int, default=6)
+    parser.add_argument('--backends', default=','.join(BACKENDS),
+                        help=f"comma-separated subset of: {', '.join(BACKENDS)} "
+                             f"(optionally name:param, e.g. sketch:128 or sketch:128:24)")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    backends = [name.strip() for name in args.backends.split(',') if name.strip()]
+    unknown = [name for name in backends if name.partition(':')[0] not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)}")
+
+    report = evaluate_collection(COLLECTIONS[args.collection], args.k, backends)
+    print(json.dumps(report, indent=2) if args.json else format_report(report, args.k))
+
+
+if __name__ == "__main__":
+    main()
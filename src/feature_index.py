@@ -0,0 +1,278 @@
+"""
+feature_index.py - In-process feature index with copy-on-write snapshots
+
+Searches read the current IndexSnapshot without locking; a snapshot is never
+modified after it is published. Writers hand new or re-extracted features to
+FeatureIndex.publish, which builds the next snapshot from a copy and swaps it
+in with a single reference assignment. Publishes that arrive within a short
+window are coalesced into one new snapshot (group commit), so a burst of
+uploads costs one matrix copy instead of one per upload.
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+from types import MappingProxyType
+import numpy as np
+from src.utils import (load_features_from_json, feature_vector, block_offsets,
+                       blockwise_distances, top_k_smallest, feature_profile)
+
+
+# Publishes whose changed rows a snapshot remembers (see rows_changed_since)
+CHANGE_HISTORY = 64
+
+
+class IndexSnapshot:
+    """
+    Immutable set of feature rows; matrix is None while the index is empty.
+    All rows come from the same extraction profile.
+
+    Snapshots derived from one another by publishes share a lineage and
+    remember which rows the last CHANGE_HISTORY publishes replaced or
+    appended, so derived structures (e.g. sketches) can be updated instead
+    of rebuilt. A loaded or replaced snapshot starts a new lineage.
+    """
+
+    def __init__(self, names, paths, matrix, offsets, version=0, profile=None,
+                 lineage=None, changes=()):
+        self.names = tuple(names)
+        self.paths = tuple(paths)
+        self.positions = MappingProxyType({name: i for i, name in enumerate(self.names)})
+        self.matrix = matrix
+        self.offsets = offsets
+        self.version = version
+        self.profile = profile
+        self.lineage = lineage if lineage is not None else object()
+        self.changes = changes
+        if matrix is not None:
+            matrix.flags.writeable = False
+            offsets.flags.writeable = False
+
+    def __len__(self):
+        return len(self.names)
+
+    # Rows replaced or appended after an earlier version of this lineage, or
+    # None if that version is older than the remembered history
+    def rows_changed_since(self, version):
+        if version == self.version:
+            return np.empty(0, dtype=np.intp)
+        if not self.changes or self.changes[0][0] > version + 1:
+            return None
+        return np.unique(np.concatenate([rows for v, rows in self.changes if v > version]))
+
+    # New snapshot with rows replaced or appended; self is left untouched
+    def with_updates(self, rows, offsets, profile):
+        updates = {}
+        for name, path, vector in rows:
+            updates[name] = (path, vector)
+
+        names = list(self.names)
+        paths = list(self.paths)
+        new_names = [name for name in updates if name not in self.positions]
+        width = len(next(iter(updates.values()))[1]) if self.matrix is None else self.matrix.shape[1]
+        matrix = np.empty((len(names) + len(new_names), width))
+        if self.matrix is not None:
+            matrix[:len(names)] = self.matrix
+            offsets = self.offsets
+
+        for name in new_names:
+            names.append(name)
+            paths.append(None)
+        positions = {name: i for i, name in enumerate(names)}
+        for name, (path, vector) in updates.items():
+            matrix[positions[name]] = vector
+            paths[positions[name]] = path
+
+        changed = np.array([positions[name] for name in updates], dtype=np.intp)
+        changes = (self.changes + ((self.version + 1, changed),))[-CHANGE_HISTORY:]
+        return IndexSnapshot(names, paths, matrix, np.array(offsets), self.version + 1,
+                             self.profile or profile, self.lineage, changes)
+
+
+class FeatureIndex:
+    """
+    Holder of the current snapshot for one collection.
+
+    Args:
+        blocks (list): (block_name, keys) layout of the feature vectors
+        snapshot (IndexSnapshot): initial contents
+        batch_window (float): seconds a publisher waits for other writers
+            to join its batch
+    """
+
+    def __init__(self, blocks, snapshot=None, batch_window=0.02):
+        self.blocks = blocks
+        self.batch_window = batch_window
+        self._snapshot = snapshot if snapshot is not None else IndexSnapshot([], [], None, None)
+        self._lock = threading.Lock()
+        self._published = threading.Condition(self._lock)
+        self._pending = []
+        self._next_generation = 0
+        self._published_generation = -1
+        self._publishing = False
+        self.publish_count = 0
+
+    # Current snapshot; safe to use from any thread without locking
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    # Swap in a fully rebuilt snapshot (e.g. after a full re-extraction)
+    def replace(self, snapshot):
+        with self._lock:
+            snapshot.version = self._snapshot.version + 1
+            self._snapshot = snapshot
+            self.publish_count += 1
+
+    # Feature vector for one feature dict, checked against the index layout
+    # and extraction profile
+    def _row(self, name, path, features):
+        vector = feature_vector(features, self.blocks)
+        offsets = block_offsets(features, self.blocks)
+        profile = feature_profile(features)
+        current = self._snapshot
+        if current.matrix is not None:
+            if profile != current.profile:
+                raise ValueError(f"Features of {name} use profile {profile}, "
+                                 f"the index uses {current.profile}")
+            if (vector.size != current.matrix.shape[1] or
+                    not np.array_equal(offsets, current.offsets)):
+                raise ValueError(f"Feature layout of {name} does not match the index")
+        return name, path, vector, offsets, profile
+
+    # Raise ValueError if features do not fit the index (layout or profile),
+    # so writers can check before storing anything
+    def validate(self, name, features):
+        self._row(name, None, features)
+
+    # Build and swap snapshots until the pending list is empty or our
+    # generation is visible. Called with the lock released. If a snapshot
+    # cannot be built, every publish of that batch gets the error.
+    def _run_publisher(self, target):
+        while True:
+            time.sleep(self.batch_window)
+            with self._lock:
+                tickets = self._pending
+                self._pending = []
+                generation = self._next_generation
+                self._next_generation += 1
+            batch = [row for ticket in tickets for row in ticket['rows']]
+            rows = [(name, path, vector) for name, path, vector, _, _ in batch]
+            try:
+                while rows:
+                    base = self._snapshot
+                    snapshot = base.with_updates(rows, batch[0][3], batch[0][4])
+                    with self._lock:
+                        # Rebuild if replace() swapped the snapshot meanwhile
+                        if self._snapshot is base:
+                            self._snapshot = snapshot
+                            self.publish_count += 1
+                            break
+            except Exception as e:
+                for ticket in tickets:
+                    ticket['error'] = e
+            except BaseException:
+                # Interrupted: leave the batch for the next publisher
+                with self._lock:
+                    self._pending[:0] = tickets
+                raise
+            with self._lock:
+                self._published_generation = generation
+                if generation >= target:
+                    self._publishing = False
+                self._published.notify_all()
+                if not self._publishing:
+                    return
+
+    # Add or replace features; returns once they are visible to searches
+    def publish(self, items):
+        """
+        Publish features into the index.
+
+        Args:
+            items (list): (image_name, image_path, features) triples
+
+        Returns:
+            int: Version of the snapshot containing the items
+        """
+        rows = [self._row(name, path, features) for name, path, features in items]
+        if not rows:
+            return self._snapshot.version
+
+        ticket = {'rows': rows, 'error': None}
+        with self._lock:
+            self._pending.append(ticket)
+            target = self._next_generation
+            while True:
+                if self._published_generation >= target:
+                    publisher = False
+                    break
+                if not self._publishing:
+                    self._publishing = publisher = True
+                    break
+                self._published.wait()
+
+        if publisher:
+            try:
+                self._run_publisher(target)
+            except BaseException:
+                with self._lock:
+                    self._publishing = False
+                    self._published.notify_all()
+                raise
+        if ticket['error'] is not None:
+            raise ticket['error']
+        return self._snapshot.version
+
+
+# Build a snapshot from a features folder, keeping images that still exist.
+# Only features of one extraction profile are loaded: the given one, or else
+# that of the first file. Files of other profiles are skipped and reported.
+def load_snapshot(features_folder, images_folder, extensions, blocks, profile=None):
+    names, paths, rows = [], [], []
+    offsets, skipped = None, []
+    for json_file in sorted(Path(features_folder).glob('*.json')):
+        for ext in extensions:
+            image_path = os.path.join(images_folder, json_file.stem + ext)
+            if os.path.exists(image_path):
+                break
+        else:
+            continue
+
+        features = load_features_from_json(str(json_file))
+        if profile is None:
+            profile = feature_profile(features)
+        if feature_profile(features) != profile:
+            skipped.append(json_file.name)
+            continue
+        if offsets is None:
+            offsets = block_offsets(features, blocks)
+        names.append(os.path.basename(image_path))
+        paths.append(image_path)
+        rows.append(feature_vector(features, blocks))
+
+    if skipped:
+        print(f"Skipped {len(skipped)} feature files in {features_folder} not using "
+              f"profile {profile} (re-extract them): {', '.join(skipped[:5])}"
+              f"{', ...' if len(skipped) > 5 else ''}")
+    if not rows:
+        return IndexSnapshot([], [], None, None)
+    return IndexSnapshot(names, paths, np.vstack(rows), offsets, profile=profile)
+
+
+# Retrieve the top_k rows closest to an indexed query image.
+# Same result format as retrieve_similar_shapes/textures.
+def search_snapshot(snapshot, query_image_name, block_weights, top_k=6):
+    if query_image_name not in snapshot.positions:
+        raise ValueError(f"Image not indexed: {query_image_name}")
+
+    query_row = snapshot.positions[query_image_name]
+    distances = blockwise_distances(snapshot.matrix, snapshot.matrix[query_row],
+                                    snapshot.offsets) @ block_weights
+    distances[query_row] = np.inf
+
+    results = []
+    for row in top_k_smallest(distances, min(top_k, len(snapshot) - 1)):
+        results.append((snapshot.names[row], float(distances[row]), snapshot.paths[row]))
+    return results
@@ -0,0 +1,173 @@
+import os
+import numpy as np
+from pathlib import Path
+from src.utils import (load_features_from_json, save_features_to_json,
+                       feature_vector, block_offsets, blockwise_distances,
+                       top_k_smallest, feature_profile)
+from src.shape_features import extract_shape_features
+from src.texture_features import extract_texture_features
+from src.shape_retrieval import SHAPE_BLOCKS, shape_block_weights
+from src.texture_retrieval import TEXTURE_BLOCKS, texture_block_weights
+
+
+HYBRID_EXTENSIONS = ['.gif', '.png', '.jpg', '.jpeg']
+FUSION_METHODS = ('weighted', 'rrf')
+
+
+# Extract both shape and texture features for every image of a catalogue
+def process_all_hybrid_images(input_folder, shape_output_folder, texture_output_folder,
+                              texture_profile='default'):
+    os.makedirs(shape_output_folder, exist_ok=True)
+    os.makedirs(texture_output_folder, exist_ok=True)
+
+    image_files = []
+    for ext in HYBRID_EXTENSIONS:
+        image_files.extend(Path(input_folder).glob(f'*{ext}'))
+
+    print(f"Processing {len(image_files)} hybrid images...")
+
+    processed = 0
+    for image_path in sorted(image_files):
+        try:
+            shape_feats = extract_shape_features(str(image_path))
+            texture_feats = extract_texture_features(str(image_path), profile=texture_profile)
+            save_features_to_json(
+                shape_feats, os.path.join(shape_output_folder, image_path.stem + '.json'))
+            save_features_to_json(
+                texture_feats, os.path.join(texture_output_folder, image_path.stem + '.json'))
+            processed += 1
+            print(f"Processed: {image_path.name}")
+        except Exception as e:
+            print(f"Error with {image_path.name}: {str(e)}")
+
+    print(f"Successfully processed {processed}/{len(image_files)} images.")
+
+
+# Build an in-memory index holding both feature families per image.
+# Only images with shape features, texture features and an image file
+# are indexed. Rows are [shape blocks | texture blocks].
+def build_hybrid_index(shape_features_folder, texture_features_folder, images_folder):
+    shape_files = {p.stem: p for p in Path(shape_features_folder).glob('*.json')}
+    texture_files = {p.stem: p for p in Path(texture_features_folder).glob('*.json')}
+
+    names, paths, rows = [], [], []
+    offsets, shape_profile, texture_profile = None, None, None
+    for stem in sorted(shape_files.keys() & texture_files.keys()):
+        image_path = None
+        for ext in HYBRID_EXTENSIONS:
+            candidate = os.path.join(images_folder, stem + ext)
+            if os.path.exists(candidate):
+                image_path = candidate
+                break
+        if image_path is None:
+            continue
+
+        shape_feats = load_features_from_json(str(shape_files[stem]))
+        texture_feats = load_features_from_json(str(texture_files[stem]))
+        if offsets is None:
+            shape_offsets = block_offsets(shape_feats, SHAPE_BLOCKS)
+            shape_dim = feature_vector(shape_feats, SHAPE_BLOCKS).size
+            texture_offsets = block_offsets(texture_feats, TEXTURE_BLOCKS)
+            offsets = np.concatenate([shape_offsets, texture_offsets + shape_dim])
+            shape_profile = feature_profile(shape_feats)
+            texture_profile = feature_profile(texture_feats)
+        elif feature_profile(shape_feats) != shape_profile:
+            raise ValueError(f"Mixed shape profiles in {shape_features_folder}: "
+                             f"{stem} uses {feature_profile(shape_feats)}, "
+                             f"others use {shape_profile}")
+        elif feature_profile(texture_feats) != texture_profile:
+            raise ValueError(f"Mixed texture profiles in {texture_features_folder}: "
+                             f"{stem} uses {feature_profile(texture_feats)}, "
+                             f"others use {texture_profile}")
+
+        rows.append(np.concatenate([feature_vector(shape_feats, SHAPE_BLOCKS),
+                                    feature_vector(texture_feats, TEXTURE_BLOCKS)]))
+        names.append(os.path.basename(image_path))
+        paths.append(image_path)
+
+    if not rows:
+        raise ValueError(
+            f"No images with both shape and texture features in {images_folder}")
+
+    return {
+        'names': names,
+        'paths': paths,
+        'positions': {name: i for i, name in enumerate(names)},
+        'matrix': np.vstack(rows),
+        'offsets': offsets,
+        'num_shape_blocks': len(SHAPE_BLOCKS),
+        'shape_profile': shape_profile,
+        'texture_profile': texture_profile,
+    }
+
+
+# Shape and texture distances of every indexed image to one query row
+def compute_hybrid_distances(index, query_vector, shape_weights=None, texture_weights=None):
+    per_block = blockwise_distances(index['matrix'], query_vector, index['offsets'])
+    split = index['num_shape_blocks']
+    shape_dist = per_block[:, :split] @ shape_block_weights(shape_weights)
+    texture_dist = per_block[:, split:] @ texture_block_weights(texture_weights)
+    return shape_dist, texture_dist
+
+
+# Min-max normalize distances to [0, 1] over the candidate set
+def _normalize_distances(distances):
+    low, high = distances.min(), distances.max()
+    if high - low == 0:
+        return np.zeros_like(distances)
+    return (distances - low) / (high - low)
+
+
+# Ranks (0 = closest) of each distance within the candidate set
+def _ranks(distances):
+    ranks = np.empty(distances.size, dtype=np.intp)
+    ranks[np.argsort(distances, kind='stable')] = np.arange(distances.size)
+    return ranks
+
+
+# Fuse shape and texture distances into one score where lower is better.
+# 'weighted' sums min-max normalized distances; 'rrf' uses reciprocal-rank
+# fusion, negated so that both methods sort ascending.
+def fuse_distances(shape_dist, texture_dist, fusion='weighted',
+                   shape_weight=0.5, texture_weight=0.5, rrf_k=60):
+    if fusion == 'weighted':
+        return (shape_weight * _normalize_distances(shape_dist) +
+                texture_weight * _normalize_distances(texture_dist))
+    if fusion == 'rrf':
+        return -(shape_weight / (rrf_k + 1 + _ranks(shape_dist)) +
+                 texture_weight / (rrf_k + 1 + _ranks(texture_dist)))
+    raise ValueError(f"Unknown fusion method: {fusion} (expected one of {FUSION_METHODS})")
+
+
+# Retrieve images similar in both shape and texture to an indexed query image
+def retrieve_similar_hybrid(query_image_name, index, top_k=6, fusion='weighted',
+                            shape_weight=0.5, texture_weight=0.5,
+                            shape_weights=None, texture_weights=None, rrf_k=60):
+    if query_image_name not in index['positions']:
+        raise ValueError(f"Image not in hybrid index: {query_image_name}")
+
+    query_row = index['positions'][query_image_name]
+    shape_dist, texture_dist = compute_hybrid_distances(
+        index, index['matrix'][query_row], shape_weights, texture_weights)
+
+    candidates = np.flatnonzero(np.arange(len(index['names'])) != query_row)
+    scores = fuse_distances(shape_dist[candidates], texture_dist[candidates],
+                            fusion, shape_weight, texture_weight, rrf_k)
+
+    results = []
+    for i in top_k_smallest(scores, top_k):
+        row = candidates[i]
+        results.append((index['names'][row], float(scores[i]), index['paths'][row]))
+
+    return results
+
+
+if __name__ == "__main__":
+    index = build_hybrid_index('features/Hybrid/Formes', 'features/Hybrid/Textures',
+                               'data/Hybrid')
+    query = index['names'][0]
+    for fusion in FUSION_METHODS:
+        print(f"Results ({fusion}):")
+        results = retrieve_similar_hybrid(query, index, 6, fusion=fusion)
+        for i, (name, score, path) in enumerate(results, 1):
+            print(f"{i}. {name:20s} Score: {score:.6f}")
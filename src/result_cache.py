@@ -0,0 +1,106 @@
+"""
+result_cache.py - Server-side cache of ranked search results
+
+Deep result lists (top 1,000+ for browse-style UIs) are ranked once per
+query and kept in a bounded LRU cache with a time-to-live. Clients then read
+them page by page through opaque cursors, or as one NDJSON stream, without
+the ranking being recomputed. A cached ranking is a plain list of
+(name, score, path) tuples taken from one index snapshot, so its pages stay
+consistent while new snapshots are published.
+"""
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+
+class RankedResultCache:
+    """
+    LRU cache of ranked result lists.
+
+    Args:
+        max_entries (int): Rankings kept at most (least recently used go first)
+        ttl (float): Seconds a ranking stays valid after it was computed
+    """
+
+    def __init__(self, max_entries=128, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+        self.ids = {}
+        self.counters = {'hits': 0, 'misses': 0, 'expired': 0}
+
+    # Drop expired entries and trim to max_entries; called with the lock held
+    def _evict(self, now):
+        for result_id in [rid for rid, entry in self.entries.items() if entry['expires'] <= now]:
+            self._drop(result_id)
+        while len(self.entries) > self.max_entries:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, result_id):
+        entry = self.entries.pop(result_id)
+        if self.ids.get(entry['key']) == result_id:
+            del self.ids[entry['key']]
+
+    def get_or_rank(self, key, info, rank):
+        """
+        Cached ranking for key, computing it with rank() on a miss.
+
+        Args:
+            key: Hashable description of the search (collection, snapshot
+                version, query, parameters)
+            info (dict): Search description returned with every page
+                (query image, fusion method, ...)
+            rank (callable): Returns the ranked (name, score, path) list
+
+        Returns:
+            tuple: (result_id, entry) where entry has 'info' and 'results'
+        """
+        now = time.monotonic()
+        with self.lock:
+            self._evict(now)
+            result_id = self.ids.get(key)
+            if result_id is not None:
+                self.entries.move_to_end(result_id)
+                self.counters['hits'] += 1
+                return result_id, self.entries[result_id]
+            self.counters['misses'] += 1
+
+        entry = {'key': key, 'info': info, 'results': rank(), 'expires': now + self.ttl}
+        result_id = secrets.token_urlsafe(9)
+        with self.lock:
+            self.entries[result_id] = entry
+            self.ids[key] = result_id
+            self._evict(now)
+        return result_id, entry
+
+    def resolve(self, cursor):
+        """
+        Look up a cursor from make_cursor.
+
+        Returns:
+            tuple: (result_id, entry, offset), or None if the cursor is
+                malformed or its ranking expired
+        """
+        result_id, _, offset = str(cursor).rpartition(':')
+        if not offset.isdigit():
+            return None
+        with self.lock:
+            self._evict(time.monotonic())
+            entry = self.entries.get(result_id)
+            if entry is None:
+                self.counters['expired'] += 1
+                return None
+            self.entries.move_to_end(result_id)
+            return result_id, entry, int(offset)
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, entries=len(self.entries))
+
+
+# Opaque cursor pointing at offset in a cached ranking
+def make_cursor(result_id, offset):
+    return f"{result_id}:{offset}"
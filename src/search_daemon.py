@@ -0,0 +1,174 @@
+"""
+search_daemon.py - Warm search daemon behind a local Unix socket
+
+`python cli.py serve` loads the feature indexes once and answers search
+requests over a Unix socket, so later `python cli.py search` invocations
+skip re-reading features/ and return in milliseconds. The protocol is one
+JSON object per line in each direction:
+
+  {"op": "search", "collection": "shapes", "queries": ["apple-1.gif"], "top_k": 6}
+  {"op": "search", ..., "prefilter": "sketch"}   (Hamming prefilter, exact re-rank)
+  {"op": "reload", "collection": "shapes"}
+  {"op": "stats"}
+
+Client functions only use the standard library, so a client process does
+not pay for importing numpy/OpenCV.
+"""
+
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+
+
+DEFAULT_SOCKET = os.environ.get('CBIR_SOCKET', 'cbir.sock')
+
+
+# Send one request to a running daemon. Raises OSError when none is listening.
+def request_daemon(request, socket_path=DEFAULT_SOCKET, timeout=30.0):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall(json.dumps(request).encode() + b'\n')
+        with sock.makefile('rb') as stream:
+            line = stream.readline()
+    if not line:
+        raise ConnectionError(f"No response from search daemon at {socket_path}")
+    return json.loads(line)
+
+
+# True when a daemon answers on socket_path
+def daemon_running(socket_path=DEFAULT_SOCKET):
+    try:
+        request_daemon({'op': 'stats'}, socket_path, timeout=2.0)
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+# Search results of one query as JSON-ready dicts
+def format_results(results):
+    return [{'rank': i, 'name': name, 'distance': float(dist), 'path': path}
+            for i, (name, dist, path) in enumerate(results, 1)]
+
+
+# Warm indexes of the given catalog collections, keyed by name
+def load_indexes(collections):
+    from src.feature_index import FeatureIndex, load_snapshot
+
+    return {c['name']: FeatureIndex(c['blocks'], load_snapshot(
+        c['features_folder'], c['images_folder'], c['extensions'], c['blocks'],
+        c.get('profile'))) for c in collections}
+
+
+def search_queries(index, collection, queries, top_k=6, prefilter=None, sketch_cache=None):
+    """
+    Run several queries against one index snapshot.
+
+    Args:
+        prefilter (str): None for an exact scan, 'sketch' for a Hamming
+            sketch prefilter with exact re-rank
+        sketch_cache (dict): Keeps the sketch between calls (see
+            sketch.snapshot_sketch)
+
+    Returns:
+        list: {'query', 'results'} dicts, or {'query', 'error'} for queries
+            that failed (e.g. image not indexed)
+    """
+    from src.feature_index import search_snapshot
+    from src.sketch import snapshot_sketch, search_sketch
+
+    if prefilter not in (None, 'sketch'):
+        raise ValueError(f"Unknown prefilter: {prefilter}")
+    snapshot = index.snapshot
+    weights = collection['block_weights']()
+    sketch = None
+    if prefilter == 'sketch' and len(snapshot) > 1:
+        sketch = snapshot_sketch(snapshot, weights, {} if sketch_cache is None else sketch_cache)
+    answers = []
+    for query in queries:
+        try:
+            if sketch is not None:
+                results = search_sketch(snapshot, sketch, os.path.basename(query), weights, top_k)
+            else:
+                results = search_snapshot(snapshot, os.path.basename(query), weights, top_k)
+            answers.append({'query': query, 'results': format_results(results)})
+        except Exception as e:
+            answers.append({'query': query, 'error': str(e)})
+    return answers
+
+
+class SearchDaemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+    Unix socket server answering search requests from warm indexes.
+
+    Args:
+        socket_path (str): Socket file to listen on
+        collections (list): catalog.COLLECTIONS entries to serve
+    """
+
+    daemon_threads = True
+
+    def __init__(self, socket_path, collections):
+        self.socket_path = socket_path
+        self.collections = {c['name']: c for c in collections}
+        self.indexes = load_indexes(collections)
+        self.sketch_caches = {name: {} for name in self.indexes}
+        self.started = time.time()
+        self.stats_lock = threading.Lock()
+        self.requests = 0
+        if os.path.exists(socket_path):
+            if daemon_running(socket_path):
+                raise OSError(f"A search daemon is already listening on {socket_path}")
+            os.unlink(socket_path)
+        super().__init__(socket_path, _RequestHandler)
+
+    # Answer one decoded request
+    def handle_request(self, request):
+        with self.stats_lock:
+            self.requests += 1
+        op = request.get('op')
+
+        if op == 'stats':
+            return {'success': True, 'uptime': time.time() - self.started,
+                    'requests': self.requests,
+                    'collections': {name: {'images': len(index.snapshot),
+                                           'version': index.snapshot.version}
+                                    for name, index in self.indexes.items()}}
+
+        name = request.get('collection')
+        if name not in self.collections:
+            return {'success': False, 'error': f"Unknown collection: {name}"}
+        collection = self.collections[name]
+
+        if op == 'search':
+            answers = search_queries(self.indexes[name], collection,
+                                     request.get('queries', []), int(request.get('top_k', 6)),
+                                     request.get('prefilter'), self.sketch_caches[name])
+            return {'success': True, 'answers': answers}
+        if op == 'reload':
+            from src.feature_index import load_snapshot
+
+            self.indexes[name].replace(load_snapshot(
+                collection['features_folder'], collection['images_folder'],
+                collection['extensions'], collection['blocks'], collection.get('profile')))
+            return {'success': True, 'images': len(self.indexes[name].snapshot)}
+        return {'success': False, 'error': f"Unknown op: {op}"}
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                response = self.server.handle_request(json.loads(line))
+            except Exception as e:
+                response = {'success': False, 'error': str(e)}
+            self.wfile.write(json.dumps(response).encode() + b'\n')
+            self.wfile.flush()
@@ -6,17 +6,57 @@ from pathlib import Path
 from src.utils import save_features_to_json, load_image
 
 
-# Shape Feature Extraction using Contour Analysis
-def extract_contour(gray_image):
+# Contour points the descriptors are computed on (None: every boundary pixel)
+DEFAULT_CONTOUR_POINTS = 256
+
+
+# Descriptor profile recorded with shape features. 'default' is the original
+# full-pixel contour; features of different profiles are never mixed.
+def shape_profile(num_contour_points=DEFAULT_CONTOUR_POINTS):
+    if num_contour_points is None:
+        return 'default'
+    return f'contour{num_contour_points}'
+
+
+SHAPE_PROFILE = shape_profile()
+
+
+# Shape Feature Extraction using Contour Analysis.
+# CHAIN_APPROX_SIMPLE keeps only the polygon vertices of the same outline,
+# which is enough when the contour is resampled afterwards. Vertex counts
+# then say little about size, so the longest outline is picked by arc length.
+def extract_contour(gray_image, approximation=cv2.CHAIN_APPROX_NONE):
     _, binary = cv2.threshold(gray_image, 127, 255, 
                               cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
     contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
-                                   cv2.CHAIN_APPROX_NONE)
+                                   approximation)
     
     if len(contours) == 0:
         return None
     
-    return max(contours, key=len)
+    if approximation == cv2.CHAIN_APPROX_NONE:
+        return max(contours, key=len)
+    return max(contours, key=lambda c: cv2.arcLength(c, True))
+
+
+# Resample a closed contour to num_points equally spaced along its arc length.
+# Bounds descriptor cost regardless of image resolution and gives an
+# FFT-friendly length (a power of two by default).
+def resample_contour(contour, num_points=256):
+    if contour is None or len(contour) < 3:
+        return contour
+    
+    points = contour.reshape(-1, 2).astype(np.float64)
+    closed = np.vstack([points, points[:1]])
+    segment_lengths = np.hypot(*np.diff(closed, axis=0).T)
+    arc_length = np.concatenate([[0.0], np.cumsum(segment_lengths)])
+    
+    if arc_length[-1] == 0:
+        return contour
+    
+    samples = np.linspace(0.0, arc_length[-1], num_points, endpoint=False)
+    return np.column_stack([np.interp(samples, arc_length, closed[:, 0]),
+                            np.interp(samples, arc_length, closed[:, 1])])
 
 
 # Fourier Descriptors
@@ -87,11 +127,18 @@ def edge_direction_histogram(contour, num_bins=36):
 
 
 # Main function to extract all shape features
-def extract_shape_features(image_path, num_fourier=20, num_direction_bins=36):
+# (num_contour_points=None keeps every boundary pixel, without resampling)
+def extract_shape_features(image_path, num_fourier=20, num_direction_bins=36,
+                           num_contour_points=DEFAULT_CONTOUR_POINTS):
     gray, _ = load_image(image_path)
-    contour = extract_contour(gray)
-    fourier_desc = fourier_descriptors(contour, num_fourier)
-    direction_hist = edge_direction_histogram(contour, num_direction_bins)
+    if num_contour_points is None:
+        contour = extract_contour(gray)
+        points = contour
+    else:
+        contour = extract_contour(gray, cv2.CHAIN_APPROX_SIMPLE)
+        points = resample_contour(contour, num_contour_points)
+    fourier_desc = fourier_descriptors(points, num_fourier)
+    direction_hist = edge_direction_histogram(points, num_direction_bins)
     
     # Compute Hu moments
     moments = cv2.moments(contour) if contour is not None else {}
@@ -101,7 +148,8 @@ def extract_shape_features(image_path, num_fourier=20, num_direction_bins=36):
         'image_name': os.path.basename(image_path),
         'fourier_descriptors': fourier_desc,
         'direction_histogram': direction_hist,
-        'hu_moments': np.log(np.abs(hu_moments) + 1e-10)
+        'hu_moments': np.log(np.abs(hu_moments) + 1e-10),
+        'profile': shape_profile(num_contour_points)
     }
 
 
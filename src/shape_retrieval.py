@@ -1,17 +1,33 @@
 
+import heapq
 import os
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
 from pathlib import Path
 from PIL import Image
-from src.utils import load_features_from_json, euclidean_distance
+from src.utils import (load_features_from_json, euclidean_distance,
+                       feature_profile)
+
+
+# Feature blocks compared by compute_shape_distance, in vector order
+SHAPE_BLOCKS = [
+    ('fourier', ['fourier_descriptors']),
+    ('direction', ['direction_histogram']),
+    ('hu_moments', ['hu_moments']),
+]
+
+DEFAULT_SHAPE_WEIGHTS = {'fourier': 0.5, 'direction': 0.3, 'hu_moments': 0.2}
 
 
 # Compute weighted distance between two shape feature sets
 def compute_shape_distance(features1, features2, weights=None):
     if weights is None:
-        weights = {'fourier': 0.5, 'direction': 0.3, 'hu_moments': 0.2}
+        weights = DEFAULT_SHAPE_WEIGHTS
+    
+    if feature_profile(features1) != feature_profile(features2):
+        raise ValueError(f"Cannot compare shape features of profiles "
+                         f"{feature_profile(features1)} and {feature_profile(features2)}")
     
     fourier_dist = euclidean_distance(
         features1['fourier_descriptors'],
@@ -33,6 +49,13 @@ def compute_shape_distance(features1, features2, weights=None):
             weights['hu_moments'] * hu_dist)
 
 
+# Per-block weights aligned with SHAPE_BLOCKS
+def shape_block_weights(weights=None):
+    if weights is None:
+        weights = DEFAULT_SHAPE_WEIGHTS
+    return np.array([weights[name] for name, _ in SHAPE_BLOCKS])
+
+
 # Retrieve similar shapes based on shape features
 def retrieve_similar_shapes(query_image_name, features_folder, images_folder, top_k=6):
     query_json = os.path.join(features_folder, Path(query_image_name).stem + '.json')
@@ -41,11 +64,15 @@ def retrieve_similar_shapes(query_image_name, features_folder, images_folder, to
         raise ValueError(f"Feature file not found: {query_json}")
     
     query_features = load_features_from_json(query_json)
+    query_profile = feature_profile(query_features)
     distances = []
     
     for json_file in Path(features_folder).glob('*.json'):
         image_name = json_file.stem
         features = load_features_from_json(str(json_file))
+        # Features from another descriptor profile are not comparable
+        if feature_profile(features) != query_profile:
+            continue
         distance = compute_shape_distance(query_features, features)
         
         for ext in ['.gif', '.png', '.jpg', '.jpeg']:
@@ -54,7 +81,8 @@ def retrieve_similar_shapes(query_image_name, features_folder, images_folder, to
                 distances.append((os.path.basename(image_path), distance, image_path))
                 break
     
-    distances.sort(key=lambda x: x[1])
+    # Only the top_k + 1 smallest can be returned (the query itself is skipped)
+    distances = heapq.nsmallest(top_k + 1, distances, key=lambda x: x[1])
     
     results = []
     for img_name, dist, img_path in distances:
@@ -0,0 +1,198 @@
+"""
+sketch.py - Binary sketches for Hamming-distance prefiltering
+
+Each indexed feature vector is reduced to a short bit string packed into
+uint64 words. A query first scans the packed codes by Hamming distance
+(xor + popcount), which touches a few bytes per image instead of the full
+float vector, then re-ranks the best candidates with the exact weighted
+block distance.
+
+Bits come from either sign random projections ('srp') or iterative
+quantization ('itq', PCA followed by a learned rotation; it yields at most
+min(N, D) bits, e.g. 63 for shape vectors). Both operate on the centered vector with each
+block scaled by its distance weight, so blocks contribute roughly as they
+do in compute_shape_distance / compute_texture_distance.
+
+A trained model is kept for an index's lineage of snapshots: after a
+publish only the new or replaced rows are encoded into the next sketch.
+The model is retrained only when the index is rebuilt (loaded or replaced).
+"""
+
+import numpy as np
+from src.utils import blockwise_distances, top_k_smallest
+
+
+SKETCH_METHODS = ('srp', 'itq')
+
+# 8-bit popcount table for numpy versions without np.bitwise_count
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+# Per-column weights expanding block weights over their columns
+def _column_weights(offsets, width, block_weights):
+    bounds = list(offsets) + [width]
+    weights = np.empty(width)
+    for b, weight in enumerate(block_weights):
+        weights[bounds[b]:bounds[b + 1]] = weight
+    return weights
+
+
+# Iterative quantization rotation for PCA-projected data
+def _itq_rotation(projected, iterations, rng):
+    num_bits = projected.shape[1]
+    rotation, _ = np.linalg.qr(rng.standard_normal((num_bits, num_bits)))
+    for _ in range(iterations):
+        codes = np.where(projected @ rotation >= 0, 1.0, -1.0)
+        u, _, vt = np.linalg.svd(codes.T @ projected)
+        rotation = (u @ vt).T
+    return rotation
+
+
+def train_sketch(matrix, offsets, block_weights, num_bits=64, method='srp',
+                 seed=0, itq_iterations=50, max_train=20000):
+    """
+    Learn a sketch model from a row-per-image feature matrix.
+
+    Args:
+        matrix (np.ndarray): (N, D) feature matrix (e.g. IndexSnapshot.matrix)
+        offsets (np.ndarray): Block start columns
+        block_weights (np.ndarray): Weight of each block's distance
+        num_bits (int): Bits per sketch (ITQ uses at most min(N, D))
+        method (str): 'srp' or 'itq'
+        max_train (int): Rows sampled to fit the ITQ rotation
+
+    Returns:
+        dict: Sketch model for encode_sketches
+    """
+    if method not in SKETCH_METHODS:
+        raise ValueError(f"Unknown sketch method: {method} (expected one of {SKETCH_METHODS})")
+
+    rng = np.random.default_rng(seed)
+    mean = matrix.mean(axis=0)
+    column_weights = _column_weights(offsets, matrix.shape[1], block_weights)
+    centered = (matrix - mean) * column_weights
+
+    if method == 'srp':
+        projection = rng.standard_normal((matrix.shape[1], num_bits))
+    else:
+        num_bits = min(num_bits, *matrix.shape)
+        if len(centered) > max_train:
+            centered = centered[rng.choice(len(centered), max_train, replace=False)]
+        _, _, vt = np.linalg.svd(centered, full_matrices=False)
+        pca = vt[:num_bits].T
+        projection = pca @ _itq_rotation(centered @ pca, itq_iterations, rng)
+
+    return {
+        'method': method,
+        'num_bits': num_bits,
+        'mean': mean,
+        'column_weights': column_weights,
+        'projection': projection,
+    }
+
+
+# Pack (N, num_bits) booleans into (N, ceil(num_bits / 64)) uint64 words,
+# stored word-major so each word column is scanned contiguously
+def pack_bits(bits):
+    num_words = -(-bits.shape[1] // 64)
+    padded = np.zeros((bits.shape[0], num_words * 64), dtype=bool)
+    padded[:, :bits.shape[1]] = bits
+    return np.asfortranarray(np.packbits(padded, axis=1).view(np.uint64))
+
+
+# Packed sketches of the rows of matrix
+def encode_sketches(model, matrix):
+    projected = ((np.atleast_2d(matrix) - model['mean']) * model['column_weights']) @ model['projection']
+    return pack_bits(projected >= 0)
+
+
+# Set bits per uint64 word
+def _popcount(words):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(words)
+    return _POPCOUNT_TABLE[words.view(np.uint8).reshape(len(words), 8)].sum(axis=1, dtype=np.uint8)
+
+
+# Hamming distance between every packed code and one query code, one word
+# column at a time
+def hamming_distances(codes, query_code):
+    distances = np.zeros(len(codes), dtype=np.intp)
+    for w in range(codes.shape[1]):
+        distances += _popcount(np.bitwise_xor(codes[:, w], query_code[w]))
+    return distances
+
+
+# Sketch a whole snapshot; the result is tied to that snapshot's version
+def build_sketch_index(snapshot, block_weights, num_bits=64, method='srp', seed=0):
+    model = train_sketch(snapshot.matrix, snapshot.offsets, block_weights,
+                         num_bits, method, seed)
+    return {
+        'model': model,
+        'codes': encode_sketches(model, snapshot.matrix),
+        'version': snapshot.version,
+        'lineage': snapshot.lineage,
+    }
+
+
+# Sketch of a later snapshot of the same lineage with the same model: codes
+# are copied and only the given rows are encoded
+def update_sketch_index(sketch, snapshot, rows):
+    codes = np.empty((len(snapshot), sketch['codes'].shape[1]), dtype=np.uint64, order='F')
+    codes[:len(sketch['codes'])] = sketch['codes']
+    if len(rows):
+        codes[rows] = encode_sketches(sketch['model'], snapshot.matrix[rows])
+    return {
+        'model': sketch['model'],
+        'codes': codes,
+        'version': snapshot.version,
+        'lineage': snapshot.lineage,
+    }
+
+
+# Sketch of a snapshot, kept in cache (a dict owned by the caller, one per
+# index). Later snapshots of the same lineage reuse the trained model and
+# encode only rows changed since the cached sketch (all rows if the history
+# no longer reaches back); a new lineage trains a new model.
+def snapshot_sketch(snapshot, block_weights, cache, num_bits=64, method='srp'):
+    sketch = cache.get('current')
+    if sketch is None or sketch['lineage'] is not snapshot.lineage:
+        sketch = build_sketch_index(snapshot, block_weights, num_bits, method)
+    elif sketch['version'] > snapshot.version:
+        # A search still on an older snapshot: encode it whole, keep the cache
+        return {'model': sketch['model'], 'codes': encode_sketches(sketch['model'], snapshot.matrix),
+                'version': snapshot.version, 'lineage': snapshot.lineage}
+    elif sketch['version'] < snapshot.version:
+        rows = snapshot.rows_changed_since(sketch['version'])
+        if rows is None:
+            rows = np.arange(len(snapshot))
+        sketch = update_sketch_index(sketch, snapshot, rows)
+    cache['current'] = sketch
+    return sketch
+
+
+# Retrieve via Hamming prefilter + exact re-rank. Same result format as
+# search_snapshot; num_candidates defaults to max(100 * top_k, 1000).
+def search_sketch(snapshot, sketch, query_image_name, block_weights, top_k=6,
+                  num_candidates=None):
+    if sketch['version'] != snapshot.version:
+        raise ValueError("Sketch index was built for another snapshot version")
+    if query_image_name not in snapshot.positions:
+        raise ValueError(f"Image not indexed: {query_image_name}")
+
+    query_row = snapshot.positions[query_image_name]
+    if num_candidates is None:
+        num_candidates = max(100 * top_k, 1000)
+
+    hamming = hamming_distances(sketch['codes'], sketch['codes'][query_row])
+    hamming[query_row] = np.iinfo(hamming.dtype).max
+    candidates = top_k_smallest(hamming, min(num_candidates, len(snapshot) - 1))
+
+    query_vector = snapshot.matrix[query_row]
+    distances = blockwise_distances(snapshot.matrix[candidates], query_vector,
+                                    snapshot.offsets) @ block_weights
+
+    results = []
+    for i in top_k_smallest(distances, top_k):
+        row = candidates[i]
+        results.append((snapshot.names[row], float(distances[i]), snapshot.paths[row]))
+    return results
@@ -2,6 +2,7 @@
 import cv2
 import numpy as np
 import os
+import threading
 from pathlib import Path
 from scipy import ndimage
 from skimage.feature import graycomatrix, graycoprops
@@ -120,51 +121,523 @@ def glcm_features(image, distances=[1, 3, 5], angles=[0, np.pi/4, np.pi/2, 3*np.
     return np.array(features)
 
 
-# Extract all texture features from image
-def extract_texture_features(image_path):
+# Named extraction profiles. 'default' is the original full-resolution
+# pipeline. 'fast' and 'extended' (a larger Gabor bank, coarseness range and
+# set of GLCM offsets) are built on image pyramids: Gabor scale s
+# applies one small kernel (wavelength 4) to pyramid level s instead of a
+# wavelength 2**(s+2) kernel to the full image, and coarseness box means
+# come from a 2x2 averaging pyramid instead of large sliding windows.
+# Features of different profiles are not comparable and never mixed.
+TEXTURE_PROFILES = {
+    'fast': {
+        'size': 128, 'pyramid': True, 'num_orientations': 6, 'num_scales': 4,
+        'ksize': 13, 'sigma': 2.0, 'k_max': 5, 'glcm_distances': [1, 2],
+    },
+    'default': {
+        'size': 256, 'pyramid': False, 'num_orientations': 8, 'num_scales': 4,
+        'ksize': 21, 'sigma': 3.0, 'k_max': 5, 'glcm_distances': [1, 3, 5],
+    },
+    'extended': {
+        'size': 256, 'pyramid': True, 'num_orientations': 8, 'num_scales': 5,
+        'ksize': 21, 'sigma': 3.0, 'k_max': 6, 'glcm_distances': [1, 2, 3, 5, 7],
+    },
+}
+
+
+# Profile settings by name
+def get_texture_profile(profile):
+    if profile not in TEXTURE_PROFILES:
+        raise ValueError(f"Unknown texture profile: {profile} "
+                         f"(expected one of {', '.join(TEXTURE_PROFILES)})")
+    return TEXTURE_PROFILES[profile]
+
+
+# Load an image as the fixed-size grayscale array used for texture features
+def load_texture_image(image_path, size=256):
     gray, _ = load_image(image_path)
-    gray = cv2.resize(gray, (256, 256))
-    
-    gabor_feats = gabor_filters(gray, num_orientations=8, num_scales=4)
-    coarseness = tamura_coarseness(gray)
-    contrast = tamura_contrast(gray)
-    direction_hist, directionality = tamura_directionality(gray)
-    glcm_feats = glcm_features(gray)
-    
-    return {
-        'image_name': os.path.basename(image_path),
-        'gabor_features': gabor_feats,
-        'tamura_coarseness': coarseness,
-        'tamura_contrast': contrast,
-        'tamura_directionality': directionality,
-        'direction_histogram': direction_hist,
-        'glcm_features': glcm_feats
-    }
-
-
-# Batch processing of texture images
-def process_all_texture_images(input_folder, output_folder):
+    return cv2.resize(gray, (size, size))
+
+
+class TextureContext:
+    """
+    Preallocated working set for texture extraction.
+
+    Holds the intermediates shared by the texture features for a stack of up
+    to `capacity` uint8 images at the profile's size: the float image, Sobel
+    gradients, gradient magnitude and angle, quantized GLCM levels, and either
+    a padded integral image or, for pyramid profiles, Gaussian and box
+    pyramids. load() fills them in place and each feature method reads them, so
+    extracting image after image (or batch after batch) reuses one set of
+    buffers instead of allocating per image and per feature.
+
+    Filters run once per stack: images are laid out vertically with
+    reflected top/bottom borders and sliced back after filtering.
+    Results match the per-image functions above, except for Gabor
+    statistics, which agree to float32 precision.
+    """
+
+    # Border rows around each stacked image; covers the 21x21 Gabor kernel
+    # and the 3x3 Sobel kernel
+    STACK_PAD = 10
+
+    def __init__(self, capacity=1, profile='default', glcm_levels=16):
+        self.capacity = capacity
+        self.profile = profile
+        self.settings = get_texture_profile(profile)
+        self.size = size = self.settings['size']
+        self.k_max = k_max = self.settings['k_max']
+        self.glcm_levels = glcm_levels
+        self.count = 0
+        # Coarseness windows reach (w - 1) // 2 pixels back, w // 2 forward
+        self.box_pad = 2 ** (k_max - 1) // 2
+
+        stacked_rows = capacity * (size + 2 * self.STACK_PAD)
+        integral_side = size + 2 * self.box_pad + 1
+        frame = (capacity, size, size)
+
+        self.stacked = np.empty((stacked_rows, size), np.uint8)
+        self.filtered = np.empty((stacked_rows, size), np.float32)
+        self.gx = np.empty((stacked_rows, size), np.float64)
+        self.gy = np.empty((stacked_rows, size), np.float64)
+        self.reflected = np.empty((capacity, size + 2 * self.box_pad,
+                                   size + 2 * self.box_pad), np.uint8)
+        self.integral = np.empty((capacity, integral_side, integral_side), np.float64)
+        self.gray = np.empty(frame, np.float64)
+        self.scratch = np.empty(frame, np.float64)
+        self.magnitude = np.empty(frame, np.float64)
+        self.angle = np.empty(frame, np.float64)
+        self.mask = np.empty(frame, bool)
+        self.averages = np.empty((2,) + frame, np.float64)
+        self.best_energy = np.empty(frame, np.float64)
+        self.best_scale = np.empty(frame, np.intp)
+        self.quantized = np.empty(frame, np.uint8)
+        self.codes = np.empty(capacity * size * size, np.intp)
+        self.gabor_bank = {}
+
+        if self.settings['pyramid']:
+            gabor_pad = self.settings['ksize'] // 2
+            gabor_sides = [size >> level for level in range(self.settings['num_scales'])]
+            box_sides = [size >> level for level in range(k_max)]
+            if gabor_sides[-1] <= gabor_pad or size % (1 << max(len(gabor_sides), k_max)):
+                raise ValueError(f"Profile {profile}: size {size} too small for its pyramid")
+            self.gaussian = [np.empty((capacity, side, side), np.float32) for side in gabor_sides]
+            self.gaussian_stacked = [np.empty((capacity * (side + 2 * gabor_pad), side), np.float32)
+                                     for side in gabor_sides]
+            self.gaussian_filtered = [np.empty_like(buffer) for buffer in self.gaussian_stacked]
+            self.box = [np.empty((capacity, side, side), np.float64) for side in box_sides]
+            self.box_energy = np.empty(frame, np.float64)
+
+    # (count, size, size) view of a stacked buffer, borders dropped
+    def _frames(self, stacked):
+        pad = self.STACK_PAD
+        return stacked[:self.count * (self.size + 2 * pad)].reshape(
+            self.count, self.size + 2 * pad, self.size)[:, pad:pad + self.size]
+
+    # Compute the shared intermediates for a (B, size, size) uint8 stack
+    def load(self, images):
+        images = np.asarray(images, dtype=np.uint8)
+        if images.ndim == 2:
+            images = images[None]
+        if len(images) > self.capacity or images.shape[1:] != (self.size, self.size):
+            raise ValueError(
+                f"Expected at most {self.capacity} images of {self.size}x{self.size}, "
+                f"got {images.shape}")
+
+        self.count = n = len(images)
+        pad, box = self.STACK_PAD, self.box_pad
+        blocks = self.stacked[:n * (self.size + 2 * pad)].reshape(n, self.size + 2 * pad, self.size)
+        for i in range(n):
+            cv2.copyMakeBorder(images[i], pad, pad, 0, 0, cv2.BORDER_REFLECT_101, dst=blocks[i])
+            if not self.settings['pyramid']:
+                # ndimage 'reflect' mode repeats the edge pixel, as BORDER_REFLECT
+                cv2.copyMakeBorder(images[i], box, box, box, box, cv2.BORDER_REFLECT,
+                                   dst=self.reflected[i])
+                cv2.integral(self.reflected[i], sum=self.integral[i], sdepth=cv2.CV_64F)
+
+        rows = n * (self.size + 2 * pad)
+        np.copyto(self.gray[:n], images)
+        cv2.Sobel(self.stacked[:rows], cv2.CV_64F, 1, 0, dst=self.gx[:rows], ksize=3)
+        cv2.Sobel(self.stacked[:rows], cv2.CV_64F, 0, 1, dst=self.gy[:rows], ksize=3)
+
+        gx, gy = self._frames(self.gx), self._frames(self.gy)
+        magnitude, angle, scratch = self.magnitude[:n], self.angle[:n], self.scratch[:n]
+        np.multiply(gx, gx, out=magnitude)
+        np.multiply(gy, gy, out=scratch)
+        np.add(magnitude, scratch, out=magnitude)
+        np.sqrt(magnitude, out=magnitude)
+        np.arctan2(gy, gx, out=angle)
+        np.multiply(angle, 180, out=angle)
+        np.divide(angle, np.pi, out=angle)
+        np.add(angle, 180, out=angle)
+        np.remainder(angle, 180, out=angle)
+
+        np.floor_divide(images, 256 // self.glcm_levels, out=self.quantized[:n])
+        if self.settings['pyramid']:
+            self._load_pyramids(images)
+        return self
+
+    # Gaussian pyramid (for Gabor) and 2x2 box-mean pyramid (for coarseness)
+    def _load_pyramids(self, images):
+        n = self.count
+        np.copyto(self.gaussian[0][:n], images)
+        for level in range(1, len(self.gaussian)):
+            for i in range(n):
+                cv2.pyrDown(self.gaussian[level - 1][i], dst=self.gaussian[level][i])
+        
+        np.copyto(self.box[0][:n], images)
+        for level in range(1, len(self.box)):
+            finer, coarser = self.box[level - 1][:n], self.box[level][:n]
+            np.add(finer[:, 0::2, 0::2], finer[:, 1::2, 0::2], out=coarser)
+            np.add(coarser, finer[:, 0::2, 1::2], out=coarser)
+            np.add(coarser, finer[:, 1::2, 1::2], out=coarser)
+            np.multiply(coarser, 0.25, out=coarser)
+
+    # Cached Gabor kernels for a bank configuration
+    def _gabor_kernels(self, num_orientations, num_scales):
+        key = (num_orientations, num_scales)
+        if key not in self.gabor_bank:
+            self.gabor_bank[key] = [
+                cv2.getGaborKernel(ksize=(21, 21), sigma=3.0,
+                                   theta=orientation * np.pi / num_orientations,
+                                   lambd=2 ** (scale + 2), gamma=0.5, psi=0,
+                                   ktype=cv2.CV_32F)
+                for scale in range(num_scales)
+                for orientation in range(num_orientations)
+            ]
+        return self.gabor_bank[key]
+
+    def gabor_features(self, num_orientations=8, num_scales=5):
+        if self.settings['pyramid']:
+            return self._pyramid_gabor_features(num_orientations, num_scales)
+        
+        kernels = self._gabor_kernels(num_orientations, num_scales)
+        rows = self.count * (self.size + 2 * self.STACK_PAD)
+        features = np.empty((self.count, 2 * len(kernels)))
+        
+        for k, kernel in enumerate(kernels):
+            cv2.filter2D(self.stacked[:rows], cv2.CV_32F, kernel, dst=self.filtered[:rows])
+            frames = self._frames(self.filtered)
+            for i in range(self.count):
+                mean, std = cv2.meanStdDev(frames[i])
+                features[i, 2 * k] = mean[0, 0]
+                features[i, 2 * k + 1] = std[0, 0]
+        
+        return features
+
+    # Gabor bank on the Gaussian pyramid: scale s filters level s with the
+    # wavelength-4 kernels, matching a 2**s larger kernel on the full image
+    def _pyramid_gabor_features(self, num_orientations, num_scales):
+        ksize, pad = self.settings['ksize'], self.settings['ksize'] // 2
+        key = ('pyramid', num_orientations)
+        if key not in self.gabor_bank:
+            self.gabor_bank[key] = [
+                cv2.getGaborKernel(ksize=(ksize, ksize), sigma=self.settings['sigma'],
+                                   theta=orientation * np.pi / num_orientations,
+                                   lambd=4, gamma=0.5, psi=0, ktype=cv2.CV_32F)
+                for orientation in range(num_orientations)
+            ]
+        kernels = self.gabor_bank[key]
+        features = np.empty((self.count, 2 * num_scales * num_orientations))
+        
+        for level in range(num_scales):
+            side = self.size >> level
+            rows = self.count * (side + 2 * pad)
+            stacked = self.gaussian_stacked[level][:rows]
+            blocks = stacked.reshape(self.count, side + 2 * pad, side)
+            for i in range(self.count):
+                cv2.copyMakeBorder(self.gaussian[level][i], pad, pad, 0, 0,
+                                   cv2.BORDER_REFLECT_101, dst=blocks[i])
+            
+            for o, kernel in enumerate(kernels):
+                filtered = self.gaussian_filtered[level][:rows]
+                cv2.filter2D(stacked, cv2.CV_32F, kernel, dst=filtered)
+                frames = filtered.reshape(self.count, side + 2 * pad, side)[:, pad:pad + side]
+                column = 2 * (level * num_orientations + o)
+                for i in range(self.count):
+                    mean, std = cv2.meanStdDev(frames[i])
+                    features[i, column] = mean[0, 0]
+                    features[i, column + 1] = std[0, 0]
+        
+        return features
+
+    # Coarseness from the box pyramid: level k holds 2**k x 2**k block means,
+    # and each pixel takes the level k with the largest |A_k - A_k+1|
+    def _pyramid_coarseness(self):
+        n, size = self.count, self.size
+        best_energy, best_scale = self.best_energy[:n], self.best_scale[:n]
+        better = self.mask[:n]
+        
+        for k in range(self.k_max - 1):
+            side = size >> k
+            finer = self.box[k][:n].reshape(n, side // 2, 2, side // 2, 2)
+            coarser = self.box[k + 1][:n][:, :, None, :, None]
+            energy = self.box_energy[:n].reshape(-1)[:n * side * side].reshape(finer.shape)
+            np.subtract(finer, coarser, out=energy)
+            np.abs(energy, out=energy)
+            
+            # Compare at full resolution through broadcast views
+            block = 1 << k
+            shape = (n, side, block, side, block)
+            energy_full = energy.reshape(n, side, 1, side, 1)
+            if k == 0:
+                np.copyto(best_energy.reshape(shape), energy_full)
+                best_scale.fill(0)
+            else:
+                np.greater(energy_full, best_energy.reshape(shape), out=better.reshape(shape))
+                np.copyto(best_scale, k, where=better)
+                np.maximum(best_energy.reshape(shape), energy_full, out=best_energy.reshape(shape))
+        
+        weights = 2.0 ** np.arange(self.k_max - 1)
+        return np.array([
+            np.bincount(best_scale[i].ravel(), minlength=self.k_max - 1) @ weights / best_scale[i].size
+            for i in range(n)
+        ])
+
+    # Tamura coarseness with box means from the integral image
+    def coarseness(self):
+        if self.settings['pyramid']:
+            return self._pyramid_coarseness()
+        
+        n, size, box = self.count, self.size, self.box_pad
+        integral = self.integral[:n]
+        averages = self.averages[:, :n]
+        energy = self.scratch[:n]
+        best_energy, best_scale = self.best_energy[:n], self.best_scale[:n]
+        better = self.mask[:n]
+        
+        np.copyto(averages[0], self.gray[:n])
+        for k in range(1, self.k_max):
+            window = 2 ** k
+            start = box - (window - 1) // 2
+            stop = start + window
+            current = averages[k % 2]
+            np.subtract(integral[:, stop:stop + size, stop:stop + size],
+                        integral[:, start:start + size, stop:stop + size], out=current)
+            np.subtract(current, integral[:, stop:stop + size, start:start + size], out=current)
+            np.add(current, integral[:, start:start + size, start:start + size], out=current)
+            np.divide(current, window ** 2, out=current)
+            
+            np.subtract(averages[(k - 1) % 2], current, out=energy)
+            np.abs(energy, out=energy)
+            if k == 1:
+                np.copyto(best_energy, energy)
+                best_scale.fill(0)
+            else:
+                np.greater(energy, best_energy, out=better)
+                np.copyto(best_scale, k - 1, where=better)
+                np.maximum(best_energy, energy, out=best_energy)
+        
+        weights = 2.0 ** np.arange(self.k_max - 1)
+        return np.array([
+            np.bincount(best_scale[i].ravel(), minlength=self.k_max - 1) @ weights / best_scale[i].size
+            for i in range(n)
+        ])
+
+    def contrast(self):
+        n = self.count
+        deviation = self.scratch[:n]
+        mean = np.mean(self.gray[:n], axis=(1, 2), keepdims=True)
+        np.subtract(self.gray[:n], mean, out=deviation)
+        np.multiply(deviation, deviation, out=deviation)
+        variance = np.mean(deviation, axis=(1, 2))
+        np.multiply(deviation, deviation, out=deviation)
+        mu4 = np.mean(deviation, axis=(1, 2))
+        
+        contrast = np.zeros(n)
+        for i in range(n):
+            if variance[i] == 0:
+                continue
+            alpha4 = mu4[i] / (variance[i] ** 2)
+            contrast[i] = np.sqrt(variance[i]) / (alpha4 ** 0.25) if alpha4 > 0 else 0
+        
+        return contrast
+
+    def directionality(self, num_bins=16):
+        n = self.count
+        magnitude, angle, significant = self.magnitude[:n], self.angle[:n], self.mask[:n]
+        threshold = np.mean(magnitude, axis=(1, 2), keepdims=True)
+        np.greater(magnitude, threshold, out=significant)
+        
+        hists = np.zeros((n, num_bins))
+        for i in range(n):
+            hist, _ = np.histogram(angle[i][significant[i]], bins=num_bins, range=(0, 180))
+            hists[i] = hist.astype(float) / hist.sum() if hist.sum() > 0 else hist
+        
+        uniform_dist = np.ones(num_bins) / num_bins
+        directionality = np.sum((hists - uniform_dist) ** 2, axis=1)
+        
+        return hists, directionality
+
+    # Symmetric, normalized co-occurrence matrices laid out as graycomatrix
+    # does, with the batch first: (B, levels, levels, distances, angles)
+    def glcm(self, distances, angles):
+        n, size, levels = self.count, self.size, self.glcm_levels
+        quantized = self.quantized[:n]
+        P = np.zeros((n, levels, levels, len(distances), len(angles)), dtype=np.uint32)
+        image_offsets = (np.arange(n) * levels * levels)[:, None, None]
+        
+        for d, distance in enumerate(distances):
+            for a, angle in enumerate(angles):
+                dr = int(round(np.sin(angle) * distance))
+                dc = int(round(np.cos(angle) * distance))
+                r0, r1 = max(0, -dr), size - max(0, dr)
+                c0, c1 = max(0, -dc), size - max(0, dc)
+                codes = self.codes[:n * (r1 - r0) * (c1 - c0)].reshape(n, r1 - r0, c1 - c0)
+                np.multiply(quantized[:, r0:r1, c0:c1], levels, out=codes, dtype=np.intp)
+                np.add(codes, quantized[:, r0 + dr:r1 + dr, c0 + dc:c1 + dc], out=codes)
+                np.add(codes, image_offsets, out=codes)
+                counts = np.bincount(codes.ravel(), minlength=n * levels * levels)
+                P[..., d, a] = counts.reshape(n, levels, levels)
+        
+        P = P + np.transpose(P, (0, 2, 1, 3, 4))
+        P = P.astype(np.float64)
+        glcm_sums = np.sum(P, axis=(1, 2), keepdims=True)
+        glcm_sums[glcm_sums == 0] = 1
+        P /= glcm_sums
+        
+        return P
+
+    def glcm_features(self, distances=[1, 3, 5], angles=[0, np.pi/4, np.pi/2, 3*np.pi/4]):
+        glcm = self.glcm(distances, angles)
+        properties = ['contrast', 'dissimilarity', 'homogeneity', 'energy', 'correlation']
+        features = np.empty((self.count, 2 * len(properties)))
+        
+        for i in range(self.count):
+            for p, prop in enumerate(properties):
+                values = graycoprops(glcm[i], prop)
+                features[i, 2 * p] = np.mean(values)
+                features[i, 2 * p + 1] = np.std(values)
+        
+        return features
+
+    # All texture features of the loaded stack, batch on the first axis
+    def extract(self):
+        settings = self.settings
+        direction_hist, directionality = self.directionality()
+        
+        return {
+            'gabor_features': self.gabor_features(settings['num_orientations'],
+                                                  settings['num_scales']),
+            'tamura_coarseness': self.coarseness(),
+            'tamura_contrast': self.contrast(),
+            'tamura_directionality': directionality,
+            'direction_histogram': direction_hist,
+            'glcm_features': self.glcm_features(distances=settings['glcm_distances'])
+        }
+
+
+# Per-thread single-image contexts for calls without one, so per-image
+# extraction (uploads, the watcher) reuses buffers and Gabor kernels across
+# calls. Batches get a context of their own, freed when the call returns, so
+# idle threads keep only one image's worth of buffers per profile.
+_thread_contexts = threading.local()
+
+
+# This thread's single-image context for a profile
+def _thread_context(profile):
+    contexts = _thread_contexts.__dict__.setdefault('by_profile', {})
+    if profile not in contexts:
+        contexts[profile] = TextureContext(capacity=1, profile=profile)
+    return contexts[profile]
+
+
+# Context to use for a profile, checking a caller-supplied one
+def _context_for(context, profile, capacity):
+    if context is None:
+        if capacity > 1:
+            return TextureContext(capacity=capacity, profile=profile or 'default')
+        return _thread_context(profile or 'default')
+    if profile is not None and profile != context.profile:
+        raise ValueError(f"Context uses profile {context.profile}, not {profile}")
+    return context
+
+
+# Extract all texture features from image. Without a TextureContext, one
+# kept per thread is reused; a given context's profile is used when profile
+# is None.
+def extract_texture_features(image_path, context=None, profile=None):
+    context = _context_for(context, profile, 1)
+    gray = load_texture_image(image_path, context.size)
+    batch_features = context.load(gray).extract()
+    return split_texture_batch([os.path.basename(image_path)], batch_features,
+                               context.profile)[0]
+
+
+# Extract texture features for a stack of images from load_texture_image
+# (at the profile's size). Returns one array per feature key, with the
+# batch on the first axis.
+def extract_texture_features_batch(images, context=None, profile=None):
+    return _context_for(context, profile, len(images)).load(images).extract()
+
+
+# Extract texture features for several image files in one batch. Returns
+# one feature dict per path, as extract_texture_features.
+def extract_texture_features_files(image_paths, context=None, profile=None):
+    context = _context_for(context, profile, len(image_paths))
+    images = np.stack([load_texture_image(path, context.size) for path in image_paths])
+    return split_texture_batch([os.path.basename(path) for path in image_paths],
+                               extract_texture_features_batch(images, context),
+                               context.profile)
+
+
+# Per-image feature dicts (as extract_texture_features) from a batch result
+def split_texture_batch(image_names, batch_features, profile='default'):
+    return [
+        {
+            'image_name': name,
+            'profile': profile,
+            **{key: values[i] for key, values in batch_features.items()}
+        }
+        for i, name in enumerate(image_names)
+    ]
+
+
+# Batch processing of texture images, batch_size images at a time with one
+# TextureContext reused for the whole folder.
+def process_all_texture_images(input_folder, output_folder, batch_size=16,
+                               profile='default'):
     os.makedirs(output_folder, exist_ok=True)
+    batch_size = max(batch_size, 1)
+    context = TextureContext(capacity=batch_size, profile=profile)
     
     image_files = []
     for ext in ['.jpg', '.jpeg', '.png']:
         image_files.extend(Path(input_folder).glob(f'*{ext}'))
+    image_files = sorted(image_files)
     
     print(f"Processing {len(image_files)} texture images...")
     
     processed = 0
-    for image_path in sorted(image_files):
+    for start in range(0, len(image_files), batch_size):
+        paths, images = [], []
+        for image_path in image_files[start:start + batch_size]:
+            try:
+                images.append(load_texture_image(str(image_path), context.size))
+                paths.append(image_path)
+            except Exception as e:
+                print(f"Error with {image_path.name}: {str(e)}")
+        if not images:
+            continue
+        
         try:
-            features = extract_texture_features(str(image_path))
-            json_path = os.path.join(output_folder, image_path.stem + '.json')
-            save_features_to_json(features, json_path)
-            processed += 1
-            print(f"Processed: {image_path.name}")
+            batch_features = extract_texture_features_batch(np.stack(images), context)
         except Exception as e:
-            print(f"Error with {image_path.name}: {str(e)}")
+            for image_path in paths:
+                print(f"Error with {image_path.name}: {str(e)}")
+            continue
+        
+        for image_path, features in zip(paths, split_texture_batch(
+                [p.name for p in paths], batch_features, profile)):
+            try:
+                json_path = os.path.join(output_folder, image_path.stem + '.json')
+                save_features_to_json(features, json_path)
+                processed += 1
+                print(f"Processed: {image_path.name}")
+            except Exception as e:
+                print(f"Error with {image_path.name}: {str(e)}")
     
     print(f"Successfully processed {processed}/{len(image_files)} images.")
 
 
 if __name__ == "__main__":
-    process_all_texture_images("data/Textures", "features/Textures")
\ No newline at end of file
+    process_all_texture_images("data/Textures", "features/Textures")
@@ -1,17 +1,37 @@
 
+import heapq
 import os
 import numpy as np
 import cv2
 import matplotlib.pyplot as plt
 from pathlib import Path
 from PIL import Image
-from src.utils import load_features_from_json, euclidean_distance
+from src.utils import (load_features_from_json, euclidean_distance,
+                       feature_profile)
+
+
+# Feature blocks compared by compute_texture_distance, in vector order
+TEXTURE_BLOCKS = [
+    ('gabor', ['gabor_features']),
+    ('tamura', ['tamura_coarseness', 'tamura_contrast', 'tamura_directionality']),
+    ('direction', ['direction_histogram']),
+    ('glcm', ['glcm_features']),
+]
+
+# Divisors applied to each block distance before weighting
+TEXTURE_BLOCK_SCALES = {'gabor': 10.0, 'tamura': 5.0, 'direction': 1.0, 'glcm': 2.0}
+
+DEFAULT_TEXTURE_WEIGHTS = {'gabor': 0.4, 'tamura': 0.3, 'direction': 0.15, 'glcm': 0.15}
 
 
 # Compute texture distance between two feature sets
 def compute_texture_distance(features1, features2, weights=None):
     if weights is None:
-        weights = {'gabor': 0.4, 'tamura': 0.3, 'direction': 0.15, 'glcm': 0.15}
+        weights = DEFAULT_TEXTURE_WEIGHTS
+    
+    if feature_profile(features1) != feature_profile(features2):
+        raise ValueError(f"Cannot compare texture features of profiles "
+                         f"{feature_profile(features1)} and {feature_profile(features2)}")
     
     gabor_dist = euclidean_distance(
         features1['gabor_features'],
@@ -50,6 +70,14 @@ def compute_texture_distance(features1, features2, weights=None):
             weights['glcm'] * glcm_dist_norm)
 
 
+# Per-block weights aligned with TEXTURE_BLOCKS, scale normalization included
+def texture_block_weights(weights=None):
+    if weights is None:
+        weights = DEFAULT_TEXTURE_WEIGHTS
+    return np.array([weights[name] / TEXTURE_BLOCK_SCALES[name]
+                     for name, _ in TEXTURE_BLOCKS])
+
+
 # Retrieve similar textures based on query image
 def retrieve_similar_textures(query_image_name, features_folder, images_folder, top_k=6):
     query_json = os.path.join(features_folder, Path(query_image_name).stem + '.json')
@@ -58,11 +86,15 @@ def retrieve_similar_textures(query_image_name, features_folder, images_folder,
         raise ValueError(f"Feature file not found: {query_json}")
     
     query_features = load_features_from_json(query_json)
+    query_profile = feature_profile(query_features)
     distances = []
     
     for json_file in Path(features_folder).glob('*.json'):
         image_name = json_file.stem
         features = load_features_from_json(str(json_file))
+        # Features from another extraction profile are not comparable
+        if feature_profile(features) != query_profile:
+            continue
         distance = compute_texture_distance(query_features, features)
         
         for ext in ['.jpg', '.jpeg', '.png']:
@@ -71,7 +103,8 @@ def retrieve_similar_textures(query_image_name, features_folder, images_folder,
                 distances.append((os.path.basename(image_path), distance, image_path))
                 break
     
-    distances.sort(key=lambda x: x[1])
+    # Only the top_k + 1 smallest can be returned (the query itself is skipped)
+    distances = heapq.nsmallest(top_k + 1, distances, key=lambda x: x[1])
     
     results = []
     for img_name, dist, img_path in distances:
@@ -4,23 +4,37 @@ utils.py - Core utility functions
 
 import json
 import os
+import threading
 import numpy as np
 import cv2
 from PIL import Image
 
 
 def save_features_to_json(features, output_path):
-    """Save feature vectors to JSON file."""
+    """
+    Save feature vectors to JSON file.
+
+    The file is written under a temporary name and renamed into place, so
+    concurrent readers never see a partially written document.
+    """
     json_features = {}
     for key, value in features.items():
         if isinstance(value, np.ndarray):
             json_features[key] = value.tolist()
+        elif isinstance(value, np.generic):
+            json_features[key] = value.item()
         else:
             json_features[key] = value
     
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w') as f:
-        json.dump(json_features, f, indent=2)
+    tmp_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump(json_features, f, indent=2)
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
 
 
 def load_features_from_json(json_path):
@@ -97,4 +111,66 @@ def load_image(image_path):
     else:
         gray = img
     
-    return gray, img
\ No newline at end of file
+    return gray, img
+
+def feature_profile(features):
+    """Extraction profile recorded with a feature dict ('default' if absent)."""
+    return str(features.get('profile', 'default'))
+
+
+def feature_vector(features, blocks):
+    """
+    Concatenate the blocks of one feature dict into a flat vector.
+
+    Args:
+        features (dict): Feature dict as returned by load_features_from_json
+        blocks (list): (block_name, keys) pairs; the keys of a block are
+            concatenated in order
+
+    Returns:
+        np.ndarray: 1-D float64 vector
+    """
+    parts = []
+    for _, keys in blocks:
+        for key in keys:
+            parts.append(np.atleast_1d(np.asarray(features[key], dtype=np.float64)).ravel())
+    return np.concatenate(parts)
+
+
+def block_offsets(features, blocks):
+    """Column offset of each block in the vector built by feature_vector."""
+    offsets = []
+    position = 0
+    for _, keys in blocks:
+        offsets.append(position)
+        for key in keys:
+            position += np.atleast_1d(np.asarray(features[key])).size
+    return np.array(offsets, dtype=np.intp)
+
+
+def blockwise_distances(matrix, query_vector, offsets):
+    """
+    Per-block Euclidean distances between every row and a query vector.
+
+    Computes all blocks in a single pass over the matrix, so the cost is
+    one subtraction and one reduction regardless of the number of blocks.
+
+    Returns:
+        np.ndarray: (num_rows, num_blocks) distance matrix
+    """
+    diff = matrix - query_vector
+    np.multiply(diff, diff, out=diff)
+    return np.sqrt(np.add.reduceat(diff, offsets, axis=1))
+
+
+def top_k_smallest(values, k):
+    """Indices of the k smallest values, sorted ascending (ties by index)."""
+    values = np.asarray(values)
+    k = min(k, values.size)
+    if k <= 0:
+        return np.array([], dtype=np.intp)
+    if k < values.size:
+        candidates = np.argpartition(values, k - 1)[:k]
+    else:
+        candidates = np.arange(values.size)
+    return candidates[np.lexsort((candidates, values[candidates]))]
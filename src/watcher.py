@@ -0,0 +1,431 @@
+"""
+watcher.py - Directory watcher for continuous feature ingestion
+
+Watches image folders and extracts features for new or modified files only.
+Filesystem events come from inotify on Linux and from periodic directory
+scans elsewhere. Events are debounced per file, queued on a bounded ingest
+queue (backpressure: the watcher stops draining events while the queue is
+full) and extracted in micro-batches on a worker pool. Each finished batch is
+written to the features folder and handed to an optional publish callback.
+Collections with a hash index skip extraction for duplicates (see dedup.py).
+"""
+
+import ctypes
+import ctypes.util
+import os
+import queue
+import select
+import struct
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from src.utils import save_features_to_json, load_features_from_json, feature_profile
+from src.dedup import check_duplicate
+
+
+# inotify constants from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0x00000800
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+# Load libc with inotify support, or None when unavailable
+def _load_inotify():
+    if not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+# Paths of all files in the given folders
+def _list_files(folders):
+    paths = []
+    for folder in folders:
+        try:
+            entries = os.scandir(folder)
+        except FileNotFoundError:
+            continue
+        with entries:
+            paths.extend(entry.path for entry in entries if entry.is_file())
+    return paths
+
+
+class InotifySource:
+    """
+    Yield paths of files written or moved into the watched folders. When the
+    kernel event queue overflowed (events were lost, typically while the
+    watcher held back under backpressure), every file is reported again.
+    """
+
+    def __init__(self, libc, folders):
+        self.fd = libc.inotify_init1(IN_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.folders = {}
+        self.overflows = 0
+        for folder in folders:
+            wd = libc.inotify_add_watch(self.fd, os.fsencode(folder),
+                                        IN_CLOSE_WRITE | IN_MOVED_TO)
+            if wd < 0:
+                os.close(self.fd)
+                raise OSError(ctypes.get_errno(), f'inotify_add_watch failed: {folder}')
+            self.folders[wd] = folder
+
+    def poll(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        paths = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(buffer, offset)
+            offset += _EVENT_HEADER.size
+            name = buffer[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                self.overflows += 1
+                return _list_files(self.folders.values())
+            if wd in self.folders and name:
+                paths.append(os.path.join(self.folders[wd], os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Yield paths whose size or modification time changed between scans."""
+
+    def __init__(self, folders, interval=2.0):
+        self.folders = list(folders)
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for folder in self.folders:
+            try:
+                entries = os.scandir(folder)
+            except FileNotFoundError:
+                continue
+            with entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        changed = [path for path, state in current.items()
+                   if self.snapshot.get(path) != state]
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class IngestWatcher:
+    """
+    Long-running watcher that keeps feature folders in sync with image folders.
+
+    Args:
+        collections (list): dicts with 'name', 'images_folder',
+            'features_folder', 'extensions' and 'extract' (a callable taking
+            an image path and returning a feature dict); features of another
+            'profile' than the collection's, when it has one, are re-extracted
+        on_publish (callable): called as on_publish(collection_name, items)
+            after each micro-batch, items being (image_path, features) pairs
+        debounce (float): seconds a file must be quiet before extraction
+        batch_size (int): maximum files per micro-batch
+        max_workers (int): extraction threads
+        executor (Executor): shared pool to extract on instead of one of
+            max_workers threads owned by the watcher (left running on stop)
+        max_pending (int): ingest queue capacity
+        use_inotify (bool): None picks inotify when available
+        hash_indexes (dict): collection name -> HashIndex for duplicate detection
+        duplicate_policy (str): 'flag' or 'skip' for near duplicates
+    """
+
+    def __init__(self, collections, on_publish=None, debounce=1.0, batch_size=16,
+                 max_workers=None, max_pending=256, poll_interval=2.0, use_inotify=None,
+                 hash_indexes=None, duplicate_policy='flag', executor=None):
+        self.collections = {os.path.abspath(c['images_folder']): c for c in collections}
+        self.on_publish = on_publish
+        self.debounce = debounce
+        self.batch_size = batch_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.hash_indexes = hash_indexes or {}
+        self.duplicate_policy = duplicate_policy
+
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.pending = {}
+        self.stop_event = threading.Event()
+        self.threads = []
+        self.source = None
+        self.executor = executor
+        self.owns_executor = executor is None
+        self.stats_lock = threading.Lock()
+        self.counters = {'events': 0, 'queued': 0, 'processed': 0, 'failed': 0,
+                         'batches': 0, 'skipped': 0, 'reused': 0, 'duplicates_skipped': 0,
+                         'publish_errors': 0}
+
+    # Collection owning an image path, or None if not watched
+    def _collection_for(self, image_path):
+        collection = self.collections.get(os.path.dirname(os.path.abspath(image_path)))
+        if collection is None:
+            return None
+        if Path(image_path).suffix.lower() not in collection['extensions']:
+            return None
+        return collection
+
+    # Features file for an image in its collection
+    def _features_path(self, collection, image_path):
+        return os.path.join(collection['features_folder'], Path(image_path).stem + '.json')
+
+    # True when the image has no features yet, they are older than the image,
+    # or they come from another extraction profile than the collection's
+    def needs_extraction(self, image_path):
+        collection = self._collection_for(image_path)
+        if collection is None or not os.path.isfile(image_path):
+            return False
+        json_path = self._features_path(collection, image_path)
+        if (not os.path.exists(json_path) or
+                os.path.getmtime(json_path) < os.path.getmtime(image_path)):
+            return True
+        if collection.get('profile') is None:
+            return False
+        try:
+            return feature_profile(load_features_from_json(json_path)) != collection['profile']
+        except ValueError:
+            return True
+
+    def _count(self, key, amount=1):
+        with self.stats_lock:
+            self.counters[key] += amount
+
+    def stats(self):
+        with self.stats_lock:
+            counters = dict(self.counters)
+        counters['duplicates'] = {name: hash_index.stats()
+                                  for name, hash_index in self.hash_indexes.items()}
+        counters['queue_depth'] = self.queue.qsize()
+        counters['debouncing'] = len(self.pending)
+        counters['backend'] = type(self.source).__name__ if self.source else None
+        counters['overflows'] = getattr(self.source, 'overflows', 0)
+        return counters
+
+    def _open_source(self):
+        folders = list(self.collections)
+        for folder in folders:
+            os.makedirs(folder, exist_ok=True)
+        libc = _load_inotify() if self.use_inotify is not False else None
+        if libc is not None:
+            try:
+                return InotifySource(libc, folders)
+            except OSError:
+                if self.use_inotify:
+                    raise
+        elif self.use_inotify:
+            raise OSError('inotify is not available on this platform')
+        return PollingSource(folders, self.poll_interval)
+
+    # Put a path on the ingest queue, blocking while it is full
+    def _enqueue(self, image_path):
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(image_path, timeout=0.5)
+                self._count('queued')
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    # Event loop: collect events, debounce, and feed the ingest queue
+    def _watch(self):
+        for collection in self.collections.values():
+            for ext in collection['extensions']:
+                for image_path in Path(collection['images_folder']).glob(f'*{ext}'):
+                    self.pending[str(image_path)] = 0.0
+
+        while not self.stop_event.is_set():
+            timeout = self.debounce / 2 if self.pending else 0.5
+            now = time.monotonic()
+            for path in self.source.poll(timeout):
+                if self._collection_for(path) is not None:
+                    self.pending[path] = now
+                    self._count('events')
+
+            now = time.monotonic()
+            ready = sorted(path for path, seen in self.pending.items()
+                           if now - seen >= self.debounce)
+            for path in ready:
+                del self.pending[path]
+                if not self.needs_extraction(path):
+                    self._count('skipped')
+                    continue
+                if not self._enqueue(path):
+                    return
+
+    # Take up to batch_size paths, waiting only for the first one
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    # Features for one image: reused from an exact duplicate, None for a
+    # skipped near duplicate, extracted otherwise. Runs on the worker pool.
+    def _prepare(self, collection, image_path):
+        hash_index = self.hash_indexes.get(collection['name'])
+        if hash_index is None:
+            return collection['extract'](image_path), None, None
+        duplicate = check_duplicate(hash_index, collection['features_folder'],
+                                    image_path, policy=self.duplicate_policy,
+                                    profile=collection.get('profile'))
+        if duplicate['action'] == 'skip':
+            return None, duplicate['action'], duplicate['hashes']
+        if duplicate['action'] == 'reuse':
+            return duplicate['features'], duplicate['action'], duplicate['hashes']
+        return collection['extract'](image_path), duplicate['action'], duplicate['hashes']
+
+    # Extract, save and publish one micro-batch
+    def process_batch(self, batch):
+        futures = []
+        for image_path in dict.fromkeys(batch):
+            collection = self._collection_for(image_path)
+            if collection is None:
+                continue
+            futures.append((collection, image_path,
+                            self.executor.submit(self._prepare, collection, image_path)))
+
+        published = {}
+        for collection, image_path, future in futures:
+            try:
+                features, action, hashes = future.result()
+                if action == 'skip':
+                    self._count('duplicates_skipped')
+                    continue
+                # Never store features the collection's index would refuse
+                if (collection.get('profile') is not None and
+                        feature_profile(features) != collection['profile']):
+                    raise ValueError(f"Features use profile {feature_profile(features)}, "
+                                     f"the collection uses {collection['profile']}")
+                save_features_to_json(features, self._features_path(collection, image_path))
+                published.setdefault(collection['name'], []).append((image_path, features))
+                if hashes is not None:
+                    self.hash_indexes[collection['name']].add(os.path.basename(image_path), *hashes)
+                self._count('reused' if action == 'reuse' else 'processed')
+            except Exception as e:
+                self._count('failed')
+                print(f"Error with {os.path.basename(image_path)}: {str(e)}")
+
+        for name in {collection['name'] for collection, _, _ in futures}:
+            if name in self.hash_indexes:
+                self.hash_indexes[name].save()
+        self._count('batches')
+        if self.on_publish is not None:
+            for name, items in list(published.items()):
+                # Features stay saved; the index picks them up on its next reload
+                try:
+                    self.on_publish(name, items)
+                except Exception as e:
+                    del published[name]
+                    self._count('failed', len(items))
+                    self._count('publish_errors')
+                    print(f"Error publishing {len(items)} {name}: {str(e)}")
+        return published
+
+    def _ingest(self):
+        while not self.stop_event.is_set() or not self.queue.empty():
+            batch = self._next_batch()
+            if not batch:
+                continue
+            try:
+                self.process_batch(batch)
+            except Exception as e:
+                self._count('failed', len(batch))
+                print(f"Error processing batch of {len(batch)}: {str(e)}")
+
+    def start(self):
+        self.source = self._open_source()
+        if self.owns_executor:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                               thread_name_prefix='ingest')
+        self.stop_event.clear()
+        self.threads = [
+            threading.Thread(target=self._watch, name='ingest-watch', daemon=True),
+            threading.Thread(target=self._ingest, name='ingest-batch', daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.owns_executor:
+            self.executor.shutdown(wait=True)
+        self.source.close()
+
+
+# Watch configuration for the default shape and texture collections
+def default_collections():
+    from src.catalog import COLLECTIONS
+
+    return [COLLECTIONS['shapes'], COLLECTIONS['textures']]
+
+
+# Hash indexes of collections, keyed by collection name
+def load_hash_indexes(collections):
+    from src.dedup import load_hash_index
+
+    return {c['name']: load_hash_index(c['hash_index'], c['images_folder'], c['extensions'])
+            for c in collections if c.get('hash_index')}
+
+
+if __name__ == "__main__":
+    def report(name, items):
+        print(f"Published {len(items)} {name}: "
+              f"{', '.join(os.path.basename(path) for path, _ in items)}")
+
+    from src.catalog import DUPLICATE_POLICY
+
+    collections = default_collections()
+    watcher = IngestWatcher(collections, on_publish=report,
+                            hash_indexes=load_hash_indexes(collections),
+                            duplicate_policy=DUPLICATE_POLICY).start()
+    print(f"Watching data/Formes and data/Textures ({watcher.stats()['backend']}). "
+          f"Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        watcher.stop()
+        print(watcher.stats())